@@ -0,0 +1,209 @@
+"""
+Keep the total inner distance of a mostly static segment set up to date
+while the rectangle moves and segments come and go
+"""
+
+import math
+
+import numpy as np
+from clipping import clip_segments
+from core import Rectangle
+from spatial import SegmentGrid
+
+
+class InnerDistanceAccumulator:
+    """Segments indexed once in a grid, queried against many rectangles
+
+    The inner length of every segment in the current rectangle is cached,
+    so moving the rectangle only re-clips the segments that aren't fully
+    inside both the old and the new one.
+    """
+
+    def __init__(self, segments=None, cell_size: float = None, max_cells: int = 64):
+        """
+        Args:
+            segments (np.ndarray, optional): (N, 4) x1, y1, x2, y2 rows.
+                Defaults to None (no segments yet).
+            cell_size (float, optional): grid cell side. Defaults to None
+                (about the data span over the square root of the first
+                inserted segments count).
+            max_cells (int, optional): segments covering more grid cells
+                are candidates of every query. Defaults to 64.
+        """
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.rectangle = None
+
+        # Segments whose inner length the last move recomputed
+        self.num_reclipped = 0
+
+        self._grid = None
+        self._size = 0
+        self._segments = np.empty((0, 4))
+        self._bboxes = np.empty((0, 4))
+        self._lengths = np.empty(0)
+        self._alive = np.empty(0, dtype=bool)
+        self._total = 0.0
+
+        if segments is not None:
+            self.insert(segments)
+
+    def __len__(self) -> int:
+        return int(self._alive[: self._size].sum())
+
+    @property
+    def total(self) -> float:
+        """Total inner distance in the current rectangle"""
+        return round(self._total, 2)
+
+    def _reserve(self, num_segments: int):
+        """Grow the storage geometrically to fit more segments"""
+        capacity = len(self._segments)
+        if self._size + num_segments <= capacity:
+            return
+
+        capacity = max(2 * capacity, self._size + num_segments, 16)
+        for name in ("_segments", "_bboxes", "_lengths", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, name, new)
+
+    def _contributions(self, ids: np.ndarray, bounds: tuple) -> np.ndarray:
+        """Inner lengths of some segments, those fully inside aren't clipped"""
+        x_min, y_min, x_max, y_max = bounds
+        segments, bboxes = self._segments[ids], self._bboxes[ids]
+
+        contained = (
+            (bboxes[:, 0] >= x_min)
+            & (bboxes[:, 1] >= y_min)
+            & (bboxes[:, 2] <= x_max)
+            & (bboxes[:, 3] <= y_max)
+        )
+
+        lengths = np.hypot(
+            segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1]
+        )
+        _, lengths[~contained], _ = clip_segments(segments[~contained], bounds)
+
+        return lengths
+
+    def insert(self, segments) -> np.ndarray:
+        """Add segments, they count towards the current rectangle right away
+
+        Args:
+            segments (np.ndarray): (N, 4) x1, y1, x2, y2 rows
+
+        Returns:
+            np.ndarray: ids of the added segments
+        """
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        bboxes = np.column_stack(
+            (
+                np.minimum(segments[:, 0], segments[:, 2]),
+                np.minimum(segments[:, 1], segments[:, 3]),
+                np.maximum(segments[:, 0], segments[:, 2]),
+                np.maximum(segments[:, 1], segments[:, 3]),
+            )
+        )
+
+        if self._grid is None:
+            if self.cell_size is None:
+                span = np.ptp(bboxes, axis=0).max() if len(bboxes) else 0
+                self.cell_size = span / math.sqrt(len(bboxes)) if span > 0 else 1.0
+            self._grid = SegmentGrid(self.cell_size, self.max_cells)
+
+        self._reserve(len(segments))
+        ids = np.arange(self._size, self._size + len(segments))
+        self._size += len(segments)
+
+        self._segments[ids] = segments
+        self._bboxes[ids] = bboxes
+        self._alive[ids] = True
+        self._grid.insert(ids, bboxes)
+
+        if self.rectangle is not None:
+            lengths = self._contributions(ids, self.rectangle.bounds)
+            self._lengths[ids] = lengths
+            self._total = math.fsum([self._total, *lengths.tolist()])
+
+        return ids
+
+    def remove(self, ids):
+        """Remove segments, their inner lengths leave the running total
+
+        Args:
+            ids (np.ndarray | list[int]): ids insert returned
+
+        Raises:
+            KeyError: when a segment doesn't exist or was already removed
+        """
+        ids = np.unique(np.asarray(ids, dtype=np.intp))
+        if not len(ids):
+            return
+
+        if ids[0] < 0 or ids[-1] >= self._size or not self._alive[ids].all():
+            raise KeyError("unknown or already removed segment ids")
+
+        self._grid.remove(ids, self._bboxes[ids])
+        self._alive[ids] = False
+
+        self._total = math.fsum([self._total, *(-self._lengths[ids]).tolist()])
+        self._lengths[ids] = 0.0
+
+    def query(self, rectangle: Rectangle) -> float:
+        """Calculate the total inner distance in any rectangle, the current
+        one is kept
+
+        Args:
+            rectangle (Rectangle): rectangle that contains intersected parts
+
+        Returns:
+            float: total inner distance
+        """
+        if self._grid is None:
+            return 0.0
+
+        ids = self._grid.query(*rectangle.bounds)
+        return round(math.fsum(self._contributions(ids, rectangle.bounds).tolist()), 2)
+
+    def move(self, rectangle: Rectangle) -> float:
+        """Make a rectangle the current one and update the running total
+
+        Args:
+            rectangle (Rectangle): the new rectangle
+
+        Returns:
+            float: total inner distance in the new rectangle
+        """
+        bounds = rectangle.bounds
+
+        if self._grid is None:
+            self.rectangle = rectangle
+            return self.total
+
+        if self.rectangle is None:
+            ids = self._grid.query(*bounds)
+        else:
+            old_bounds = self.rectangle.bounds
+            ids = np.union1d(self._grid.query(*old_bounds), self._grid.query(*bounds))
+
+            # Segments fully inside both rectangles keep their full length
+            bboxes = self._bboxes[ids]
+            unchanged = (
+                (bboxes[:, 0] >= max(old_bounds[0], bounds[0]))
+                & (bboxes[:, 1] >= max(old_bounds[1], bounds[1]))
+                & (bboxes[:, 2] <= min(old_bounds[2], bounds[2]))
+                & (bboxes[:, 3] <= min(old_bounds[3], bounds[3]))
+            )
+            ids = ids[~unchanged]
+
+        lengths = self._contributions(ids, bounds)
+        self._total = math.fsum(
+            [self._total, *lengths.tolist(), *(-self._lengths[ids]).tolist()]
+        )
+        self._lengths[ids] = lengths
+        self.rectangle = rectangle
+        self.num_reclipped = len(ids)
+
+        return self.total
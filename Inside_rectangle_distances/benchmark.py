@@ -0,0 +1,540 @@
+"""
+Benchmark the geometry primitives on synthetic lines
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import draw
+import numpy as np
+import utils
+from clipping import clip_segments
+from core import Line, Point, Rectangle
+
+
+def generate_lines(num_lines: int, seed: int = 0, span: float = 100.0) -> list[Line]:
+    """Generate random lines with endpoints in a square
+
+    Args:
+        num_lines (int): number of lines
+        seed (int, optional): random seed. Defaults to 0.
+        span (float, optional): side of the square. Defaults to 100.0.
+
+    Returns:
+        list[Line]: the generated lines
+    """
+    rng = random.Random(seed)
+
+    return [
+        Line(
+            Point(rng.uniform(0, span), rng.uniform(0, span)),
+            Point(rng.uniform(0, span), rng.uniform(0, span)),
+            name=f"l{i}",
+        )
+        for i in range(num_lines)
+    ]
+
+
+def intersection_coef_dict(line1: Line, line2: Line):
+    """Intersect two lines through a freshly built coefficients dict per
+    access, the way Line.coef used to work, the baseline for the tuple path
+
+    Args:
+        line1 (Line): first passed line
+        line2 (Line): second passed line
+
+    Returns:
+        tuple: the intersection point if it exists else None
+    """
+
+    def coef(line):
+        A = line.point1.y - line.point2.y
+        B = line.point2.x - line.point1.x
+        C = line.point1.x * line.point2.y - line.point2.x * line.point1.y
+
+        coef_values = dict()
+        coef_values["A"] = A
+        coef_values["B"] = B
+        coef_values["C"] = -C
+        return coef_values
+
+    D = coef(line1)["A"] * coef(line2)["B"] - coef(line1)["B"] * coef(line2)["A"]
+    Dx = coef(line1)["C"] * coef(line2)["B"] - coef(line1)["B"] * coef(line2)["C"]
+    Dy = coef(line1)["A"] * coef(line2)["C"] - coef(line1)["C"] * coef(line2)["A"]
+    if D != 0:
+        return Dx / D, Dy / D
+    else:
+        return None
+
+
+def _run_intersections(intersect, pairs: list) -> int:
+    num_found = 0
+    for line1, line2 in pairs:
+        if intersect(line1, line2) is not None:
+            num_found += 1
+
+    return num_found
+
+
+def bench_intersections(
+    num_intersections: int = 1_000_000, num_lines: int = 1000, seed: int = 0
+) -> dict:
+    """Compare line intersection through coefficient dicts and tuples
+
+    Each implementation is timed first, then run again on a sample under
+    tracemalloc so the tracing overhead doesn't leak into the timing.
+
+    Args:
+        num_intersections (int, optional): number of line pairs intersected.
+            Defaults to 1_000_000.
+        num_lines (int, optional): number of distinct lines the pairs are
+            drawn from. Defaults to 1000.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        dict: seconds, intersections per second and peak traced memory of
+        each implementation
+    """
+    rng = random.Random(seed)
+    lines = generate_lines(num_lines, seed)
+    pairs = [(rng.choice(lines), rng.choice(lines)) for _ in range(num_intersections)]
+
+    implementations = {
+        "coef_dict": intersection_coef_dict,
+        "coefficients": utils.intersection,
+    }
+
+    results = {"intersections": num_intersections, "implementations": {}}
+    for name, intersect in implementations.items():
+        start = time.perf_counter()
+        _run_intersections(intersect, pairs)
+        seconds = time.perf_counter() - start
+
+        # The calls don't keep their allocations, a sample shows the peak
+        tracemalloc.start()
+        try:
+            _run_intersections(intersect, pairs[:10_000])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        results["implementations"][name] = {
+            "seconds": round(seconds, 4),
+            "intersections_per_sec": round(num_intersections / seconds),
+            "peak_memory_bytes": peak,
+        }
+
+    return results
+
+
+def bench_render(
+    num_segments: int = 100_000,
+    max_segments: int = None,
+    points: bool = True,
+    seed: int = 0,
+) -> dict:
+    """Time the batched renderer writing a scene to a PNG file headlessly
+
+    Args:
+        num_segments (int, optional): number of segments. Defaults to 100_000.
+        max_segments (int, optional): decimate each kind of segments to at
+            most this many. Defaults to None (all of them).
+        points (bool, optional): draw the endpoints too. Defaults to True.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        dict: seconds, segments per second and image size
+    """
+    rng = np.random.default_rng(seed)
+    segments = rng.uniform(0, 100, (num_segments, 4))
+    rectangle = Rectangle(Point(25, 25), Point(75, 75))
+
+    clipped, _, hit = clip_segments(segments, rectangle.bounds)
+
+    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as f:
+        path = f.name
+
+    try:
+        start = time.perf_counter()
+        draw.render_scene(rectangle, segments, clipped[hit], path, max_segments, points)
+        seconds = time.perf_counter() - start
+        image_bytes = os.path.getsize(path)
+    finally:
+        os.remove(path)
+
+    return {
+        "segments": num_segments,
+        "inner_segments": int(hit.sum()),
+        "max_segments": max_segments,
+        "seconds": round(seconds, 4),
+        "segments_per_sec": round(num_segments / seconds),
+        "image_bytes": image_bytes,
+    }
+
+
+WORKLOADS = ("inside", "outside", "crossing", "parallel", "degenerate")
+
+
+def generate_workload(
+    kind: str, num_segments: int, bounds: tuple, seed: int = 0
+) -> np.ndarray:
+    """Generate random segments of one kind around a rectangle
+
+    Args:
+        kind (str): one of WORKLOADS
+        num_segments (int): number of segments
+        bounds (tuple): rectangle's x_min, y_min, x_max, y_max
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: (num_segments, 4) x1, y1, x2, y2 rows
+    """
+    rng = np.random.default_rng(seed)
+    x_min, y_min, x_max, y_max = bounds
+    width, height = x_max - x_min, y_max - y_min
+
+    def inner_points(n):
+        return np.column_stack(
+            (rng.uniform(x_min, x_max, n), rng.uniform(y_min, y_max, n))
+        )
+
+    if kind == "inside":
+        return np.hstack((inner_points(num_segments), inner_points(num_segments)))
+
+    if kind == "outside":
+        # Both endpoints beyond the same side, so the segment never enters
+        points = rng.uniform(0, 1, (num_segments, 4))
+        segments = np.empty((num_segments, 4))
+        segments[:, [0, 2]] = x_max + 1 + points[:, [0, 2]] * width
+        segments[:, [1, 3]] = y_min + (points[:, [1, 3]] * 3 - 1) * height
+        sides = rng.integers(0, 2, num_segments).astype(bool)
+        segments[sides, 0::2] = x_min + x_max - segments[sides, 0::2]
+        return segments
+
+    if kind == "crossing":
+        # From inside to a point on a circle around the rectangle
+        angles = rng.uniform(0, 2 * np.pi, num_segments)
+        radius = 2 * max(width, height)
+        centers = ((x_min + x_max) / 2, (y_min + y_max) / 2)
+        outer_points = np.column_stack(
+            (
+                centers[0] + radius * np.cos(angles),
+                centers[1] + radius * np.sin(angles),
+            )
+        )
+        segments = np.hstack((inner_points(num_segments), outer_points))
+        both_outer = rng.integers(0, 2, num_segments).astype(bool)
+        segments[both_outer, :2] = 2 * np.array(centers) - outer_points[both_outer]
+        return segments
+
+    if kind == "parallel":
+        # Horizontal and vertical segments, some of them along the sides
+        levels = rng.uniform(-0.5, 1.5, num_segments)
+        on_side = rng.integers(0, 4, num_segments) == 0
+        levels[on_side] = rng.integers(0, 2, on_side.sum())
+        starts, stops = rng.uniform(-0.5, 1.5, (2, num_segments))
+
+        segments = np.column_stack(
+            (
+                x_min + starts * width,
+                y_min + levels * height,
+                x_min + stops * width,
+                y_min + levels * height,
+            )
+        )
+        vertical = rng.integers(0, 2, num_segments).astype(bool)
+        segments[vertical] = np.column_stack(
+            (
+                x_min + levels[vertical] * width,
+                y_min + starts[vertical] * height,
+                x_min + levels[vertical] * width,
+                y_min + stops[vertical] * height,
+            )
+        )
+        return segments
+
+    if kind == "degenerate":
+        # Single points inside, outside and on the sides, and segments
+        # only touching a corner from outside
+        points = np.column_stack(
+            (
+                x_min + rng.uniform(-0.5, 1.5, num_segments) * width,
+                y_min + rng.uniform(-0.5, 1.5, num_segments) * height,
+            )
+        )
+        on_side = rng.integers(0, 3, num_segments) == 0
+        points[on_side, 0] = np.where(rng.integers(0, 2, on_side.sum()), x_min, x_max)
+        segments = np.hstack((points, points))
+
+        touching = rng.integers(0, 3, num_segments) == 0
+        corner = np.column_stack(
+            (np.full(touching.sum(), x_max), np.full(touching.sum(), y_max))
+        )
+        segments[touching] = np.hstack(
+            (corner, corner + rng.uniform(0, 1, (touching.sum(), 2)) * (-1, 1))
+        )
+        return segments
+
+    raise ValueError(f"unknown workload {kind!r}, expected one of {WORKLOADS}")
+
+
+def reference_clip(x1: float, y1: float, x2: float, y2: float, bounds: tuple):
+    """Clip a segment to a rectangle with Cohen–Sutherland, one segment at
+    a time, independently of the vectorized Liang–Barsky engine
+
+    Args:
+        x1 (float): start x
+        y1 (float): start y
+        x2 (float): end x
+        y2 (float): end y
+        bounds (tuple): rectangle's x_min, y_min, x_max, y_max
+
+    Returns:
+        tuple: the inner x1, y1, x2, y2 or None
+    """
+    x_min, y_min, x_max, y_max = bounds
+    LEFT, RIGHT, BOTTOM, TOP = 1, 2, 4, 8
+
+    def outcode(x, y):
+        code = 0
+        if x < x_min:
+            code |= LEFT
+        elif x > x_max:
+            code |= RIGHT
+        if y < y_min:
+            code |= BOTTOM
+        elif y > y_max:
+            code |= TOP
+        return code
+
+    code1, code2 = outcode(x1, y1), outcode(x2, y2)
+    while True:
+        if not code1 | code2:
+            return x1, y1, x2, y2
+        if code1 & code2:
+            return None
+
+        # Move the outside endpoint onto the side it's beyond
+        code = code1 or code2
+        if code & TOP:
+            x, y = x1 + (x2 - x1) * (y_max - y1) / (y2 - y1), y_max
+        elif code & BOTTOM:
+            x, y = x1 + (x2 - x1) * (y_min - y1) / (y2 - y1), y_min
+        elif code & RIGHT:
+            x, y = x_max, y1 + (y2 - y1) * (x_max - x1) / (x2 - x1)
+        else:
+            x, y = x_min, y1 + (y2 - y1) * (x_min - x1) / (x2 - x1)
+
+        if code == code1:
+            x1, y1 = x, y
+            code1 = outcode(x1, y1)
+        else:
+            x2, y2 = x, y
+            code2 = outcode(x2, y2)
+
+
+def reference_lengths(segments: np.ndarray, bounds: tuple) -> tuple[list, int]:
+    """Inner length of each segment with the reference clipping
+
+    Args:
+        segments (np.ndarray): (N, 4) x1, y1, x2, y2 rows
+        bounds (tuple): rectangle's x_min, y_min, x_max, y_max
+
+    Returns:
+        tuple[list, int]: inner lengths and the number of inner lines, a
+        segment only touching the rectangle has none unless it's a single
+        point
+    """
+    lengths, num_inner = [], 0
+    for x1, y1, x2, y2 in segments.tolist():
+        clipped = reference_clip(x1, y1, x2, y2, bounds)
+        length = 0.0 if clipped is None else math.dist(clipped[:2], clipped[2:])
+
+        lengths.append(length)
+        if length > 0 or (clipped is not None and (x1, y1) == (x2, y2)):
+            num_inner += 1
+
+    return lengths, num_inner
+
+
+def measure(stage, *args) -> tuple:
+    """Time a stage, then run it again under tracemalloc
+
+    The stages are pure, so the second run only measures the peak memory
+    without the tracing overhead leaking into the timing.
+
+    Args:
+        stage (Callable): the stage function
+        *args: the stage arguments
+
+    Returns:
+        tuple: stage result, seconds and peak traced memory in bytes
+    """
+    start = time.perf_counter()
+    result = stage(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        stage(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, seconds, peak
+
+
+def _stage_report(num_segments: int, seconds: float, peak: int) -> dict:
+    return {
+        "seconds": round(seconds, 6),
+        "segments_per_sec": round(num_segments / seconds) if seconds else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_geometry(
+    sizes: tuple = (1_000, 10_000, 100_000),
+    workloads: tuple = WORKLOADS,
+    location_max_size: int = 10_000,
+    tolerance: float = 1e-9,
+    seed: int = 0,
+) -> dict:
+    """Time the clipping API on random workloads and check it against the
+    reference clipping
+
+    Args:
+        sizes (tuple, optional): numbers of segments. Defaults to
+            (1_000, 10_000, 100_000).
+        workloads (tuple, optional): workload kinds. Defaults to WORKLOADS.
+        location_max_size (int, optional): location is called once per
+            segment, so it's only timed up to this size. Defaults to 10_000.
+        tolerance (float, optional): max relative error of a length.
+            Defaults to 1e-9.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        dict: seconds, segments per second, peak memory and the correctness
+        check of each stage, workload and size
+    """
+    corners = ((-2, -1), (-2, 5), (8, -1), (8, 5))
+    rectangle = utils.make_rectangle(corners)
+    bounds = rectangle.bounds
+
+    results = {"workloads": {}, "ok": True}
+    for kind in workloads:
+        runs = []
+
+        for size in sizes:
+            segments = generate_workload(kind, size, bounds, seed)
+            lines = Line.from_arrays(segments)
+            expected, expected_inner_lines = reference_lengths(segments, bounds)
+            expected_total = round(math.fsum(expected), 2)
+            scale = max(1.0, max(expected, default=0.0))
+
+            run = {"segments": size, "stages": {}}
+
+            _, seconds, peak = measure(
+                lambda: [utils.make_rectangle(corners) for _ in range(size)]
+            )
+            run["stages"]["make_rectangle"] = _stage_report(size, seconds, peak)
+
+            (inner_lines, total), seconds, peak = measure(
+                utils.calculate_inner_distances, lines, rectangle
+            )
+            run["stages"]["calculate_inner_distances"] = _stage_report(
+                size, seconds, peak
+            )
+            check = {
+                "total": total,
+                "expected_total": expected_total,
+                "inner_lines": len(inner_lines),
+                "expected_inner_lines": expected_inner_lines,
+            }
+
+            if size <= location_max_size:
+                located, seconds, peak = measure(
+                    lambda: [utils.location(line, rectangle) for line in lines]
+                )
+                run["stages"]["location"] = _stage_report(size, seconds, peak)
+
+                errors = [
+                    abs((0.0 if line is None else line.distance) - length)
+                    for line, length in zip(located, expected)
+                ]
+                check["location_max_error"] = max(errors, default=0.0)
+
+            check["ok"] = (
+                abs(total - expected_total) <= 0.01
+                and check["inner_lines"] == check["expected_inner_lines"]
+                and check.get("location_max_error", 0.0) <= tolerance * scale
+            )
+            run["check"] = check
+            results["ok"] &= check["ok"]
+            runs.append(run)
+
+        results["workloads"][kind] = runs
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=None, help="JSON report file")
+    subparsers = parser.add_subparsers(dest="suite", required=True)
+
+    intersections_parser = subparsers.add_parser(
+        "intersections", help="compare coefficient dicts and tuples"
+    )
+    intersections_parser.add_argument("--intersections", type=int, default=1_000_000)
+    intersections_parser.add_argument("--lines", type=int, default=1000)
+    intersections_parser.add_argument("--seed", type=int, default=0)
+
+    render_parser = subparsers.add_parser("render", help="time the batched renderer")
+    render_parser.add_argument("--segments", type=int, default=100_000)
+    render_parser.add_argument("--max-segments", type=int, default=None)
+    render_parser.add_argument("--no-points", action="store_true")
+    render_parser.add_argument("--seed", type=int, default=0)
+
+    geometry_parser = subparsers.add_parser(
+        "geometry", help="time and check the clipping API on workloads"
+    )
+    geometry_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    geometry_parser.add_argument(
+        "--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS)
+    )
+    geometry_parser.add_argument("--location-max-size", type=int, default=10_000)
+    geometry_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.suite == "intersections":
+        report = bench_intersections(args.intersections, args.lines, args.seed)
+    elif args.suite == "render":
+        report = bench_render(
+            args.segments, args.max_segments, not args.no_points, args.seed
+        )
+    else:
+        report = bench_geometry(
+            tuple(args.sizes),
+            tuple(args.workloads),
+            args.location_max_size,
+            seed=args.seed,
+        )
+
+    if args.output:
+        with open(args.output, mode="w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    # Fail the run when an engine disagrees with the reference clipping
+    if not report.get("ok", True):
+        raise SystemExit(1)
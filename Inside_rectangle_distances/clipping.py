@@ -0,0 +1,92 @@
+import numpy as np
+
+from core import Line
+
+
+def segments_from_lines(lines: tuple[Line]) -> np.ndarray:
+    """Convert lines to an array of their endpoints
+
+    Args:
+        lines (tuple[Line]): lines to be converted
+
+    Returns:
+        np.ndarray: (N, 4) array of x1, y1, x2, y2 rows
+    """
+    return np.array(
+        [
+            (line.point1.x, line.point1.y, line.point2.x, line.point2.y)
+            for line in lines
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+
+
+def clip_parameters(segments: np.ndarray, bounds: tuple) -> tuple[np.ndarray, ...]:
+    """Find where each segment enters and leaves a rectangle (Liang–Barsky)
+
+    A segment is x = x1 + t * dx, y = y1 + t * dy for t in [0, 1], each
+    rectangle side either raises the entering t or lowers the leaving t.
+
+    Args:
+        segments (np.ndarray): (N, 4) array of x1, y1, x2, y2 rows
+        bounds (tuple): rectangle's x_min, y_min, x_max, y_max
+
+    Returns:
+        tuple[np.ndarray, ...]: entering t, leaving t and whether each
+        segment has an inner part
+    """
+    x_min, y_min, x_max, y_max = bounds
+    x1, y1, x2, y2 = np.asarray(segments, dtype=np.float64).T
+    dx, dy = x2 - x1, y2 - y1
+
+    p = np.stack((-dx, dx, -dy, dy))
+    q = np.stack((x1 - x_min, x_max - x1, y1 - y_min, y_max - y1))
+
+    # A segment parallel to a side is either fully on its inner side or out
+    parallel = p == 0
+    outside = (parallel & (q < 0)).any(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = q / p
+
+    t_enter = np.maximum(np.where(p < 0, ratios, -np.inf).max(axis=0), 0.0)
+    t_leave = np.minimum(np.where(p > 0, ratios, np.inf).min(axis=0), 1.0)
+
+    # Segments only touching a corner or a side from outside have no inner
+    # part, a single point segment has one if it lies in the rectangle
+    is_point = parallel.all(axis=0)
+    hit = ~outside & ((t_enter < t_leave) | (is_point & (t_enter <= t_leave)))
+
+    return t_enter, t_leave, hit
+
+
+def clip_segments(segments: np.ndarray, bounds: tuple) -> tuple[np.ndarray, ...]:
+    """Clip many segments to a rectangle in one vectorized pass
+
+    Args:
+        segments (np.ndarray): (N, 4) array of x1, y1, x2, y2 rows
+        bounds (tuple): rectangle's x_min, y_min, x_max, y_max
+
+    Returns:
+        tuple[np.ndarray, ...]: (N, 4) clipped segments (NaN rows for the
+        segments outside), (N,) inner lengths and (N,) bool hit mask
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    t_enter, t_leave, hit = clip_parameters(segments, bounds)
+
+    starts, ends = segments[hit, :2], segments[hit, 2:]
+    directions = ends - starts
+    t_enter, t_leave = t_enter[hit, None], t_leave[hit, None]
+
+    # Endpoints inside the rectangle are kept as they are, start + 1 * d
+    # isn't always exactly the end
+    clipped = np.full_like(segments, np.nan)
+    clipped[hit, :2] = starts + t_enter * directions
+    clipped[hit, 2:] = np.where(t_leave < 1, starts + t_leave * directions, ends)
+
+    lengths = np.zeros(len(segments))
+    lengths[hit] = np.hypot(
+        clipped[hit, 2] - clipped[hit, 0], clipped[hit, 3] - clipped[hit, 1]
+    )
+
+    return clipped, lengths, hit
@@ -1,11 +1,12 @@
 # Import libraries
+import linecache
 import math
-import traceback
-from dataclasses import dataclass, field
+import sys
+from dataclasses import InitVar, dataclass, field
 from typing import Self
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Point:
     x: float
     y: float
@@ -31,24 +32,102 @@ class Point:
         return (self.x, self.y)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Line:
-    """Line class consists of two endpoints"""
+    """Line class consists of two endpoints
+
+    Lines are immutable, so their coefficients and distance are computed
+    once on construction instead of on every access. An unnamed line only
+    remembers where it was created, its label is read from that source
+    line when it's printed. Equality only compares the points and the
+    explicit name, so unnamed lines with the same points are equal.
+    """
 
     point1: Point
     point2: Point
     name: str = field(default=None)
+    auto_name: InitVar[bool] = True
+    _coefficients: tuple = field(init=False, repr=False, compare=False)
+    _distance: float = field(init=False, repr=False, compare=False)
+    _source: tuple = field(init=False, default=None, repr=False, compare=False)
+
+    def __post_init__(self, auto_name: bool):
+        if self.name is None and auto_name:
+            # The caller is above __post_init__ and __init__
+            frame = sys._getframe(2)
+            source = (frame.f_code.co_filename, frame.f_lineno)
+            object.__setattr__(self, "_source", source)
+
+        x1, y1 = self.point1.x, self.point1.y
+        x2, y2 = self.point2.x, self.point2.y
+
+        # The standard line equation is (Ax + By = C)
+        coefficients = (y1 - y2, x2 - x1, x2 * y1 - x1 * y2)
+        object.__setattr__(self, "_coefficients", coefficients)
+        object.__setattr__(self, "_distance", math.dist((x1, y1), (x2, y2)))
+
+    @classmethod
+    def from_arrays(cls, segments, names: list[str] = None) -> list[Self]:
+        """Create many lines at once from their endpoints
 
-    def __post_init__(self):
-        if self.name is None:
-            filename, line_number, function_name, text = traceback.extract_stack()[-3]
-            self.name = text[: text.find("=")].strip()
+        Args:
+            segments (np.ndarray | list): (N, 4) x1, y1, x2, y2 rows
+            names (list[str], optional): name of each line. Defaults to None
+                (unnamed lines).
+
+        Returns:
+            list[Line]: the created lines
+        """
+        if hasattr(segments, "tolist"):
+            segments = segments.tolist()
+
+        if names is None:
+            return [
+                cls(Point(x1, y1), Point(x2, y2), auto_name=False)
+                for x1, y1, x2, y2 in segments
+            ]
+
+        return [
+            cls(Point(x1, y1), Point(x2, y2), name, auto_name=False)
+            for (x1, y1, x2, y2), name in zip(segments, names)
+        ]
+
+    def with_points(self, point1: Point, point2: Point) -> Self:
+        """Create a line between other points that keeps this line's label
+
+        The name and the creation site are copied as they are, so an
+        unnamed line's label is still only resolved when it's printed.
+
+        Args:
+            point1 (Point): first endpoint
+            point2 (Point): second endpoint
+
+        Returns:
+            Line: the new line
+        """
+        line = Line(point1, point2, self.name, auto_name=False)
+        object.__setattr__(line, "_source", self._source)
+        return line
+
+    @property
+    def label(self) -> str:
+        """Line's name, or the variable it was assigned to when unnamed
+
+        Returns:
+            str: line's label
+        """
+        if self.name is not None or self._source is None:
+            return self.name
+
+        text = linecache.getline(*self._source).strip()
+        return text[: text.find("=")].strip()
 
     def __str__(self) -> str:
 
         output = f"Line{(self.point1.to_tuple(), self.point2.to_tuple())}"
-        if self.name is not None:
-            output = self.name + output
+        label = self.label
+        if label is not None:
+            output = label + output
         return output
 
     @property
@@ -58,10 +137,19 @@ class Line:
         Returns:
             slop_value: the slop of the line
         """
-        slop_value = (self.point1.y - self.point2.y) / (self.point1.x - self.point2.x)
+        A, B, _ = self._coefficients
+        slop_value = A / -B
         return slop_value
 
-    # The standard line equation is (Ax + By = C)
+    @property
+    def coefficients(self) -> tuple[float, float, float]:
+        """Find line's coefficients without allocating
+
+        Returns:
+            tuple[float, float, float]: line's A, B and C coefficients
+        """
+        return self._coefficients
+
     @property
     def coef(self):
         """Find line's coefficient
@@ -69,26 +157,17 @@ class Line:
         Returns:
             dict: line's coefficients
         """
-        A = self.point1.y - self.point2.y
-        B = self.point2.x - self.point1.x
-        C = self.point1.x * self.point2.y - self.point2.x * self.point1.y
-
-        coef_values = dict()
-        coef_values["A"] = A
-        coef_values["B"] = B
-        coef_values["C"] = -C
-        return coef_values
+        A, B, C = self._coefficients
+        return {"A": A, "B": B, "C": C}
 
     @property
     def distance(self) -> float:
-
         """Calculate the Euclidean distance between two points
 
         Returns:
             float: distance value
         """
-        dist = math.dist((self.point1.x, self.point1.y), (self.point2.x, self.point2.y))
-        return dist
+        return self._distance
 
 
 @dataclass
@@ -102,28 +181,12 @@ class Rectangle:
     highest_point: Point
     width: float = field(init=False)
     hight: float = field(init=False)
+    _lines: tuple = field(init=False, default=None, repr=False, compare=False)
 
     def __post_init__(self):
         self.width = self.highest_point.x - self.lowest_point.x
         self.hight = self.highest_point.y - self.lowest_point.y
 
-        self._rec_left_line = Line(
-            self.lowest_point,
-            Point(self.lowest_point.x, self.lowest_point.y + self.hight),
-        )
-        self._rec_bottom_line = Line(
-            self.lowest_point,
-            Point(self.lowest_point.x + self.width, self.lowest_point.y),
-        )
-        self._rec_right_line = Line(
-            self.highest_point,
-            Point(self.highest_point.x, self.highest_point.y - self.hight),
-        )
-        self._rec_top_line = Line(
-            self.highest_point,
-            Point(self.highest_point.x - self.width, self.highest_point.y),
-        )
-
     def is_inner(self, point: Point):
         """Check if the point is inner or in the boundary of the rectangle
 
@@ -156,17 +219,52 @@ class Rectangle:
         COND2 = point.y < self.lowest_point.y or point.y > self.highest_point.y
         return COND1 == True and COND2 == True
 
+    @property
+    def bounds(self) -> tuple:
+        """Returns the rectangle's x_min, y_min, x_max, y_max
+
+        Returns:
+            tuple: rectangle's bounds
+        """
+        return (
+            self.lowest_point.x,
+            self.lowest_point.y,
+            self.highest_point.x,
+            self.highest_point.y,
+        )
+
     @property
     def lines(self):
         """Returns the rectangle lines
 
+        The lines are only built on first access, clipping only needs the
+        rectangle's bounds.
+
         Returns:
             tuple: rectangle's lines
         """
-
-        return (
-            self._rec_left_line,
-            self._rec_bottom_line,
-            self._rec_right_line,
-            self._rec_top_line,
-        )
+        if self._lines is None:
+            self._lines = (
+                Line(
+                    self.lowest_point,
+                    Point(self.lowest_point.x, self.lowest_point.y + self.hight),
+                    name="_rec_left_line",
+                ),
+                Line(
+                    self.lowest_point,
+                    Point(self.lowest_point.x + self.width, self.lowest_point.y),
+                    name="_rec_bottom_line",
+                ),
+                Line(
+                    self.highest_point,
+                    Point(self.highest_point.x, self.highest_point.y - self.hight),
+                    name="_rec_right_line",
+                ),
+                Line(
+                    self.highest_point,
+                    Point(self.highest_point.x - self.width, self.highest_point.y),
+                    name="_rec_top_line",
+                ),
+            )
+
+        return self._lines
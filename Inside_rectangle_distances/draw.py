@@ -1,10 +1,21 @@
+import math
+
 import matplotlib.pyplot as plt
 
 import matplotlib.patches as pat
 import matplotlib.lines as lines
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 
+from clipping import segments_from_lines
 from core import Rectangle, Line, Point
 
+# Above this many segments the collections are rasterized by default, so
+# vector outputs (SVG, PDF) don't keep one path per segment
+RASTERIZE_THRESHOLD = 10_000
+
 
 def edit_figure_lim(ax: plt.Axes, line: Line) -> plt.Axes:
     """Change the figure limitation depending on the lowest and 
@@ -116,3 +127,134 @@ def plot_point(point: Point, ax: plt.Axes = None, color = None):
 
     ax.scatter(point.x, point.y, linewidth=5, color=color, marker='o', label=str(point))
     return ax
+
+
+def _as_segments(segments) -> np.ndarray:
+    if len(segments) and isinstance(segments[0], Line):
+        return segments_from_lines(segments)
+
+    return np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+
+
+def set_limits(ax: plt.Axes, segments, rectangle: Rectangle = None, margin: float = 1):
+    """Fit the axes limits to the data bounds once
+
+    Args:
+        ax (plt.Axes): axes to be edited
+        segments (np.ndarray | list[Line]): drawn segments
+        rectangle (Rectangle, optional): drawn rectangle. Defaults to None.
+        margin (float, optional): space around the data. Defaults to 1.
+
+    Returns:
+        plt.Axes: the edited axes
+    """
+    segments = _as_segments(segments)
+
+    xs, ys = [], []
+    if len(segments):
+        xs += [segments[:, [0, 2]].min(), segments[:, [0, 2]].max()]
+        ys += [segments[:, [1, 3]].min(), segments[:, [1, 3]].max()]
+
+    if rectangle is not None:
+        xs += [rectangle.lowest_point.x, rectangle.highest_point.x]
+        ys += [rectangle.lowest_point.y, rectangle.highest_point.y]
+
+    if xs:
+        ax.set_xlim(min(xs) - margin, max(xs) + margin)
+        ax.set_ylim(min(ys) - margin, max(ys) + margin)
+
+    return ax
+
+
+def plot_segments(
+    segments,
+    ax: plt.Axes = None,
+    color=None,
+    points: bool = True,
+    max_segments: int = None,
+    rasterized: bool = None,
+) -> plt.Axes:
+    """Draw many segments as one collection and their endpoints as one scatter
+
+    Args:
+        segments (np.ndarray | list[Line]): (N, 4) x1, y1, x2, y2 rows or lines
+        ax (plt.Axes, optional): previous created axes. Defaults to None.
+        color (matplotlib.colors.Color | str, optional): color value. Defaults to None.
+        points (bool, optional): draw the endpoints too. Defaults to True.
+        max_segments (int, optional): draw only an evenly strided sample of
+            at most this many segments. Defaults to None (all of them).
+        rasterized (bool, optional): rasterize the collections. Defaults to
+            None (above RASTERIZE_THRESHOLD segments).
+
+    Returns:
+        plt.Axes: a new created or the previous passed one
+    """
+    if ax is None or not isinstance(ax, plt.Axes):
+        ax = plt.axes()
+
+    segments = _as_segments(segments)
+    if max_segments is not None and len(segments) > max_segments:
+        segments = segments[:: math.ceil(len(segments) / max_segments)]
+
+    if rasterized is None:
+        rasterized = len(segments) > RASTERIZE_THRESHOLD
+
+    collection = LineCollection(
+        segments.reshape(-1, 2, 2), colors=color, linewidths=1, rasterized=rasterized
+    )
+    ax.add_collection(collection)
+
+    if points:
+        ax.scatter(
+            segments[:, [0, 2]].ravel(),
+            segments[:, [1, 3]].ravel(),
+            s=4,
+            color=color,
+            marker="o",
+            rasterized=rasterized,
+        )
+
+    return ax
+
+
+def render_scene(
+    rectangle: Rectangle,
+    lines,
+    inner_lines,
+    path,
+    max_segments: int = None,
+    points: bool = True,
+    dpi: int = 100,
+) -> Figure:
+    """Draw a rectangle with its lines and inner lines into an image file
+
+    The figure is rendered with the Agg canvas directly, so no display nor
+    pyplot state is needed.
+
+    Args:
+        rectangle (Rectangle): rectangle to be drawn
+        lines (np.ndarray | list[Line]): all the segments
+        inner_lines (np.ndarray | list[Line]): their inner parts
+        path (str | Path): output image file
+        max_segments (int, optional): draw at most this many segments of
+            each kind. Defaults to None (all of them).
+        points (bool, optional): draw the endpoints too. Defaults to True.
+        dpi (int, optional): image resolution. Defaults to 100.
+
+    Returns:
+        Figure: the rendered figure
+    """
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+
+    plot_rectangle(rectangle, ax=ax)
+    plot_segments(lines, ax=ax, color="black", points=points, max_segments=max_segments)
+    plot_segments(
+        inner_lines, ax=ax, color="green", points=points, max_segments=max_segments
+    )
+    set_limits(ax, lines, rectangle)
+
+    figure.savefig(path, dpi=dpi)
+
+    return figure
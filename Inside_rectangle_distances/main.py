@@ -3,12 +3,47 @@ Calculate the distance of the inside lines that intersect with
 rectangle 
 """
 
+import argparse
+import json
+
 import draw
 import matplotlib.pyplot as plt
+import streaming
 import utils
 from core import Line, Point, Rectangle
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--segments", default=None, help="CSV, .npy or raw float64 segments file"
+    )
+    parser.add_argument(
+        "--rectangle",
+        nargs=4,
+        type=float,
+        metavar=("X1", "Y1", "X2", "Y2"),
+        default=None,
+        help="two opposite corners of the rectangle",
+    )
+    parser.add_argument("--chunk-size", type=int, default=2**16)
+    parser.add_argument("--output", default=None, help="inner segments file")
+    args = parser.parse_args()
+
+    # Stream the segments of a file instead of plotting the testing data
+    if args.segments is not None:
+        if args.rectangle is None:
+            parser.error("--segments requires --rectangle")
+
+        x1, y1, x2, y2 = args.rectangle
+        rectangle = Rectangle(
+            Point(min(x1, x2), min(y1, y2)), Point(max(x1, x2), max(y1, y2))
+        )
+
+        report = streaming.stream_inner_distances(
+            args.segments, rectangle, args.chunk_size, args.output
+        )
+        print(json.dumps(report, indent=4))
+        parser.exit()
 
     # Testing data
     rectangle_points = ((-2, -1), (-2, 5), (8, -1), (8, 5))
@@ -0,0 +1,117 @@
+"""
+Clip large segment batches across worker processes
+"""
+
+import contextlib
+import math
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from clipping import clip_segments
+
+# Each output row holds the clipped x1, y1, x2, y2 and the inner length
+OUTPUT_COLUMNS = 5
+
+
+def _clip_shared_chunk(
+    input_name: str, output_name: str, num_segments: int, start: int, stop: int, bounds
+) -> float:
+    """Attach to the shared segments, clip a range of them in place and
+    return the compensated sum of their inner lengths"""
+    input_shm = shared_memory.SharedMemory(name=input_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+
+    segments = np.ndarray((num_segments, 4), dtype=np.float64, buffer=input_shm.buf)
+    output = np.ndarray(
+        (num_segments, OUTPUT_COLUMNS), dtype=np.float64, buffer=output_shm.buf
+    )
+    try:
+        clipped, lengths, _ = clip_segments(segments[start:stop], bounds)
+        output[start:stop, :4] = clipped
+        output[start:stop, 4] = lengths
+
+        return math.fsum(lengths.tolist())
+    finally:
+        # Drop the views before closing, numpy holds the buffers otherwise
+        del segments, output
+        input_shm.close()
+        output_shm.close()
+
+
+def inner_distances(
+    segments: np.ndarray,
+    bounds: tuple,
+    workers: int = 1,
+    chunk_size: int = 2**16,
+    executor: Executor = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """Clip segments to a rectangle and sum their inner lengths
+
+    With more than one worker the segments are placed in shared memory,
+    each worker clips contiguous chunks of them in place and returns the
+    fsum of its chunk, and the chunk sums are reduced with fsum again.
+    Starting the processes costs more than clipping small batches, pass an
+    executor to reuse the same pool across calls.
+
+    Args:
+        segments (np.ndarray): (N, 4) array of x1, y1, x2, y2 rows
+        bounds (tuple): rectangle's x_min, y_min, x_max, y_max
+        workers (int, optional): number of processes. Defaults to 1.
+        chunk_size (int, optional): segments per task. Defaults to 2**16.
+        executor (Executor, optional): process pool the chunks run in, it
+            is left running. Defaults to None (a pool of workers processes
+            started for this call).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, float]: clipped segments,
+        inner lengths and hit mask like clip_segments, and the total inner
+        distance
+    """
+    segments = np.ascontiguousarray(segments, dtype=np.float64).reshape(-1, 4)
+    num_segments = len(segments)
+
+    if (executor is None and workers <= 1) or num_segments <= chunk_size:
+        clipped, lengths, hit = clip_segments(segments, bounds)
+        return clipped, lengths, hit, math.fsum(lengths.tolist())
+
+    input_shm = shared_memory.SharedMemory(create=True, size=segments.nbytes)
+    output_shm = shared_memory.SharedMemory(
+        create=True, size=num_segments * OUTPUT_COLUMNS * 8
+    )
+    try:
+        shared = np.ndarray(segments.shape, dtype=np.float64, buffer=input_shm.buf)
+        shared[:] = segments
+        del shared
+
+        if executor is None:
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = contextlib.nullcontext(executor)
+
+        with pool as executor:
+            futures = [
+                executor.submit(
+                    _clip_shared_chunk,
+                    input_shm.name,
+                    output_shm.name,
+                    num_segments,
+                    start,
+                    min(start + chunk_size, num_segments),
+                    tuple(bounds),
+                )
+                for start in range(0, num_segments, chunk_size)
+            ]
+            total = math.fsum(future.result() for future in futures)
+
+        output = np.ndarray(
+            (num_segments, OUTPUT_COLUMNS), dtype=np.float64, buffer=output_shm.buf
+        ).copy()
+    finally:
+        input_shm.close()
+        input_shm.unlink()
+        output_shm.close()
+        output_shm.unlink()
+
+    clipped, lengths = output[:, :4], output[:, 4]
+    return clipped, lengths, ~np.isnan(clipped[:, 0]), total
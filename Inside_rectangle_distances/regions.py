@@ -0,0 +1,171 @@
+"""
+Clipping regions segments can be clipped to in batches
+
+Every region finds the parameter intervals of each segment that lie
+inside it, x = x1 + t * dx, y = y1 + t * dy for t in [0, 1], and shares
+how the inner pieces are built from them.
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+from clipping import clip_parameters
+from core import Rectangle
+
+
+class ClipRegion(ABC):
+    """Base of the clipping regions"""
+
+    @abstractmethod
+    def intervals(self, segments: np.ndarray) -> tuple[np.ndarray, ...]:
+        """Find the inner intervals of each segment
+
+        Args:
+            segments (np.ndarray): (N, 4) array of x1, y1, x2, y2 rows
+
+        Returns:
+            tuple[np.ndarray, ...]: segment index, start t and stop t of each
+            inner interval, ordered by segment then t
+        """
+
+    def clip(self, segments: np.ndarray) -> tuple[np.ndarray, ...]:
+        """Clip many segments to the region in one vectorized pass
+
+        Args:
+            segments (np.ndarray): (N, 4) array of x1, y1, x2, y2 rows
+
+        Returns:
+            tuple[np.ndarray, ...]: (M, 4) inner pieces, (M,) their lengths
+            and (M,) the index of the segment each piece belongs to
+        """
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        indices, t_start, t_stop = self.intervals(segments)
+
+        starts, ends = segments[indices, :2], segments[indices, 2:]
+        directions = ends - starts
+        t_start, t_stop = t_start[:, None], t_stop[:, None]
+
+        # start + 1 * d isn't always exactly the end
+        pieces = np.hstack(
+            (
+                starts + t_start * directions,
+                np.where(t_stop < 1, starts + t_stop * directions, ends),
+            )
+        )
+        lengths = np.hypot(pieces[:, 2] - pieces[:, 0], pieces[:, 3] - pieces[:, 1])
+
+        return pieces, lengths, indices
+
+
+class Box(ClipRegion):
+    """Axis-aligned box clipped with Liang–Barsky, only its bounds are kept"""
+
+    def __init__(self, x_min: float, y_min: float, x_max: float, y_max: float):
+        self.bounds = (x_min, y_min, x_max, y_max)
+
+    @classmethod
+    def from_rectangle(cls, rectangle: Rectangle) -> "Box":
+        return cls(*rectangle.bounds)
+
+    def intervals(self, segments: np.ndarray) -> tuple[np.ndarray, ...]:
+        t_enter, t_leave, hit = clip_parameters(segments, self.bounds)
+        indices = np.flatnonzero(hit)
+
+        return indices, t_enter[indices], t_leave[indices]
+
+
+class ConvexPolygon(ClipRegion):
+    """Convex polygon clipped with Cyrus–Beck
+
+    The inward normal of every edge is computed once, so clipping a batch
+    is a few (num edges, num segments) array operations.
+    """
+
+    def __init__(self, vertices):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        if len(vertices) < 3:
+            raise ValueError("a polygon needs at least 3 vertices")
+
+        edges = np.roll(vertices, -1, axis=0) - vertices
+        next_edges = np.roll(edges, -1, axis=0)
+        turns = edges[:, 0] * next_edges[:, 1] - edges[:, 1] * next_edges[:, 0]
+        if (turns < 0).any() and (turns > 0).any():
+            raise ValueError("the polygon isn't convex")
+
+        # Rotate the edges a quarter turn towards the inside
+        if turns.sum() >= 0:
+            normals = np.column_stack((-edges[:, 1], edges[:, 0]))
+        else:
+            normals = np.column_stack((edges[:, 1], -edges[:, 0]))
+
+        self.vertices = vertices
+        self.normals = normals
+        self._offsets = (normals * vertices).sum(axis=1)
+
+    def intervals(self, segments: np.ndarray) -> tuple[np.ndarray, ...]:
+        x1, y1, x2, y2 = np.asarray(segments, dtype=np.float64).T
+        normals_x, normals_y = self.normals[:, 0, None], self.normals[:, 1, None]
+
+        # Inside every edge means normal . (point - vertex) >= 0
+        numerators = normals_x * x1 + normals_y * y1 - self._offsets[:, None]
+        denominators = normals_x * (x2 - x1) + normals_y * (y2 - y1)
+
+        outside = ((denominators == 0) & (numerators < 0)).any(axis=0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = -numerators / denominators
+
+        t_enter = np.where(denominators > 0, ratios, -np.inf).max(axis=0)
+        t_leave = np.where(denominators < 0, ratios, np.inf).min(axis=0)
+        t_enter, t_leave = np.maximum(t_enter, 0.0), np.minimum(t_leave, 1.0)
+
+        is_point = (x1 == x2) & (y1 == y2)
+        hit = ~outside & ((t_enter < t_leave) | (is_point & (t_enter <= t_leave)))
+        indices = np.flatnonzero(hit)
+
+        return indices, t_enter[indices], t_leave[indices]
+
+
+class RectangleUnion(ClipRegion):
+    """Union of axis-aligned boxes, overlapping parts are only counted once"""
+
+    def __init__(self, boxes: list[tuple]):
+        self.boxes = [tuple(bounds) for bounds in boxes]
+
+    @classmethod
+    def from_rectangles(cls, rectangles: list[Rectangle]) -> "RectangleUnion":
+        return cls([rectangle.bounds for rectangle in rectangles])
+
+    def intervals(self, segments: np.ndarray) -> tuple[np.ndarray, ...]:
+        segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        if not self.boxes:
+            empty = np.empty(0)
+            return empty.astype(np.intp), empty, empty
+
+        # (num segments, num boxes) intervals, the missed ones sort last
+        t_enter, t_leave = [], []
+        for bounds in self.boxes:
+            box_enter, box_leave, hit = clip_parameters(segments, bounds)
+            t_enter.append(np.where(hit, box_enter, np.inf))
+            t_leave.append(np.where(hit, box_leave, -np.inf))
+
+        t_enter, t_leave = np.column_stack(t_enter), np.column_stack(t_leave)
+        order = np.argsort(t_enter, axis=1, kind="stable")
+        t_enter = np.take_along_axis(t_enter, order, axis=1)
+        t_leave = np.take_along_axis(t_leave, order, axis=1)
+
+        # An interval starts a new piece unless it begins before the
+        # furthest stop of the earlier intervals of its segment
+        furthest = np.maximum.accumulate(t_leave, axis=1)
+        previous = np.column_stack((np.full(len(segments), -np.inf), furthest[:, :-1]))
+        valid = np.isfinite(t_enter)
+        new_piece = valid & (t_enter > previous)
+
+        # Pieces end right before the next piece starts in row-major order
+        indices = np.nonzero(valid)[0]
+        t_enter, furthest, new_piece = t_enter[valid], furthest[valid], new_piece[valid]
+        piece_starts = np.flatnonzero(new_piece)
+        piece_ends = np.append(piece_starts[1:], len(new_piece))[: len(piece_starts)]
+        piece_ends -= 1
+
+        return indices[piece_starts], t_enter[piece_starts], furthest[piece_ends]
@@ -0,0 +1,236 @@
+import math
+
+import numpy as np
+from core import Line, Rectangle
+
+
+class RectangleIndex:
+    """STR bulk-loaded R-tree over rectangles' bounds
+
+    Each node holds the bounds of up to ``node_capacity`` children, so a
+    segment only visits the branches its bounding box overlaps instead
+    of every rectangle.
+    """
+
+    def __init__(self, rectangles: list[Rectangle], node_capacity: int = 16):
+        self.rectangles = list(rectangles)
+        self.node_capacity = node_capacity
+
+        # Leaves are (bounds, rectangle index) entries
+        level = [(rectangle.bounds, i) for i, rectangle in enumerate(self.rectangles)]
+
+        if not level:
+            self._root = None
+            return
+
+        # Pack each level into (bounds, (children, is_leaf)) nodes
+        # until a single root is left
+        is_leaf = True
+        while len(level) > 1 or is_leaf:
+            level = [
+                (self._union_bounds(children), (children, is_leaf))
+                for children in self._pack(level)
+            ]
+            is_leaf = False
+
+        self._root = level[0][1]
+
+    def _pack(self, entries: list) -> list[list]:
+        """Group entries into nodes with Sort-Tile-Recursive
+
+        Args:
+            entries (list): (bounds, item) entries of one tree level
+
+        Returns:
+            list[list]: the entries of each node
+        """
+        capacity = self.node_capacity
+        num_nodes = math.ceil(len(entries) / capacity)
+        num_slices = math.ceil(math.sqrt(num_nodes))
+        slice_size = num_slices * capacity
+
+        # Vertical slices by x center, then nodes by y center inside each slice
+        entries = sorted(entries, key=lambda entry: entry[0][0] + entry[0][2])
+
+        nodes = []
+        for start in range(0, len(entries), slice_size):
+            vertical_slice = sorted(
+                entries[start : start + slice_size],
+                key=lambda entry: entry[0][1] + entry[0][3],
+            )
+            for node_start in range(0, len(vertical_slice), capacity):
+                nodes.append(vertical_slice[node_start : node_start + capacity])
+
+        return nodes
+
+    @staticmethod
+    def _union_bounds(entries: list) -> tuple:
+        return (
+            min(entry[0][0] for entry in entries),
+            min(entry[0][1] for entry in entries),
+            max(entry[0][2] for entry in entries),
+            max(entry[0][3] for entry in entries),
+        )
+
+    def query(self, min_x: float, min_y: float, max_x: float, max_y: float) -> list:
+        """Find the rectangles whose bounds overlap a box
+
+        Args:
+            min_x (float): box left
+            min_y (float): box bottom
+            max_x (float): box right
+            max_y (float): box top
+
+        Returns:
+            list[int]: indices of the overlapping rectangles
+        """
+        if self._root is None:
+            return []
+
+        found = []
+        stack = [self._root]
+        while stack:
+            children, is_leaf = stack.pop()
+
+            for bounds, child in children:
+                if (
+                    bounds[0] > max_x
+                    or bounds[2] < min_x
+                    or bounds[1] > max_y
+                    or bounds[3] < min_y
+                ):
+                    continue
+
+                if is_leaf:
+                    found.append(child)
+                else:
+                    stack.append(child)
+
+        return found
+
+    def candidates(self, line: Line) -> list[int]:
+        """Find the rectangles a segment may cross
+
+        Rectangles are first found from the segment's bounding box, then
+        dropped when all their corners lie strictly on one side of the line.
+
+        Args:
+            line (Line): the segment
+
+        Returns:
+            list[int]: indices of the candidate rectangles
+        """
+        x1, y1 = line.point1.x, line.point1.y
+        x2, y2 = line.point2.x, line.point2.y
+        dx, dy = x2 - x1, y2 - y1
+
+        found = []
+        for i in self.query(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)):
+            rectangle = self.rectangles[i]
+            low, high = rectangle.lowest_point, rectangle.highest_point
+
+            sides = [
+                dx * (y - y1) - dy * (x - x1)
+                for x, y in (
+                    (low.x, low.y),
+                    (low.x, high.y),
+                    (high.x, low.y),
+                    (high.x, high.y),
+                )
+            ]
+            if min(sides) > 0 or max(sides) < 0:
+                continue
+
+            found.append(i)
+
+        return found
+
+
+class SegmentGrid:
+    """Uniform grid over segments' bounding boxes
+
+    Each segment is listed in every cell its bounding box covers, segments
+    covering more than ``max_cells`` cells are kept aside and always
+    returned, so long segments don't fill the grid.
+    """
+
+    def __init__(self, cell_size: float, max_cells: int = 64):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self._cells = {}
+        self._large = set()
+
+    def _cell_ranges(self, bboxes: np.ndarray) -> list:
+        return np.floor(np.asarray(bboxes) / self.cell_size).astype(np.int64).tolist()
+
+    def _iter_cells(self, ids: np.ndarray, bboxes: np.ndarray):
+        """Yield each segment id with its cells, or None for large segments"""
+        for segment_id, (i0, j0, i1, j1) in zip(
+            np.asarray(ids).tolist(), self._cell_ranges(bboxes)
+        ):
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > self.max_cells:
+                yield segment_id, None
+            else:
+                yield segment_id, [
+                    (i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)
+                ]
+
+    def insert(self, ids: np.ndarray, bboxes: np.ndarray):
+        """Add segments to the grid
+
+        Args:
+            ids (np.ndarray): segments' ids
+            bboxes (np.ndarray): (N, 4) min_x, min_y, max_x, max_y rows
+        """
+        for segment_id, cells in self._iter_cells(ids, bboxes):
+            if cells is None:
+                self._large.add(segment_id)
+                continue
+
+            for cell in cells:
+                self._cells.setdefault(cell, set()).add(segment_id)
+
+    def remove(self, ids: np.ndarray, bboxes: np.ndarray):
+        """Remove segments from the grid
+
+        Args:
+            ids (np.ndarray): segments' ids
+            bboxes (np.ndarray): (N, 4) bounding boxes they were inserted with
+        """
+        for segment_id, cells in self._iter_cells(ids, bboxes):
+            if cells is None:
+                self._large.discard(segment_id)
+                continue
+
+            for cell in cells:
+                cell_ids = self._cells[cell]
+                cell_ids.discard(segment_id)
+                if not cell_ids:
+                    del self._cells[cell]
+
+    def query(self, min_x: float, min_y: float, max_x: float, max_y: float):
+        """Find the segments listed in the cells a box covers
+
+        Args:
+            min_x (float): box left
+            min_y (float): box bottom
+            max_x (float): box right
+            max_y (float): box top
+
+        Returns:
+            np.ndarray: candidate segments' ids
+        """
+        [(i0, j0, i1, j1)] = self._cell_ranges([(min_x, min_y, max_x, max_y)])
+        found = set(self._large)
+
+        # Scan the occupied cells instead when the box covers more cells
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._cells):
+            for (i, j), cell_ids in self._cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    found.update(cell_ids)
+        else:
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    found.update(self._cells.get((i, j), ()))
+
+        return np.fromiter(found, dtype=np.intp, count=len(found))
@@ -0,0 +1,153 @@
+"""
+Clip segment files against a rectangle chunk by chunk
+
+Segments are x1, y1, x2, y2 rows in a CSV file, a ``.npy`` file or a raw
+float64 binary file, the binary ones are memory-mapped, so only one chunk
+is held in memory at a time.
+"""
+
+import math
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from clipping import clip_segments
+from core import Rectangle
+
+CSV_SUFFIXES = (".csv", ".txt")
+
+
+def _iter_csv_chunks(path, chunk_size: int):
+    with open(path, mode="r") as f:
+        first_line = f.readline()
+
+        # Skip the header if the first row isn't numeric
+        try:
+            [float(value) for value in first_line.split(",")[:4]]
+            pending = [first_line]
+        except ValueError:
+            pending = []
+
+        while True:
+            rows = pending + list(islice(f, chunk_size - len(pending)))
+            pending = []
+            if not rows:
+                return
+
+            yield np.loadtxt(rows, delimiter=",", usecols=(0, 1, 2, 3), ndmin=2)
+
+
+def iter_segment_chunks(path, chunk_size: int = 2**16):
+    """Read the segments of a file in chunks
+
+    Args:
+        path (str | Path): a CSV, ``.npy`` or raw float64 binary file
+        chunk_size (int, optional): segments per chunk. Defaults to 2**16.
+
+    Yields:
+        np.ndarray: (chunk_size, 4) x1, y1, x2, y2 rows, the last chunk
+        can be shorter
+    """
+    path = Path(path)
+
+    if path.suffix in CSV_SUFFIXES:
+        yield from _iter_csv_chunks(path, chunk_size)
+        return
+
+    if path.suffix == ".npy":
+        segments = np.load(path, mmap_mode="r")
+    elif path.stat().st_size:
+        segments = np.memmap(path, dtype=np.float64, mode="r")
+    else:
+        # Empty files can't be memory-mapped
+        return
+
+    segments = segments.reshape(-1, 4)
+    for start in range(0, len(segments), chunk_size):
+        yield np.asarray(segments[start : start + chunk_size], dtype=np.float64)
+
+
+def write_segments(segments: np.ndarray, f, csv: bool = False):
+    """Append segments to an open output file
+
+    Args:
+        segments (np.ndarray): (N, 4) x1, y1, x2, y2 rows
+        f (IO): output file opened in binary mode
+        csv (bool, optional): write CSV rows instead of raw float64.
+            Defaults to False.
+    """
+    if csv:
+        np.savetxt(f, segments, delimiter=",")
+    else:
+        np.ascontiguousarray(segments, dtype=np.float64).tofile(f)
+
+
+def _write_npy_header(f, num_segments: int):
+    """Write the ``.npy`` header of float64 segments at the start of a file
+
+    Every (N, 4) float64 header is padded to the same size, so the header
+    written before streaming can be overwritten once N is known.
+
+    Args:
+        f (IO): output file opened in binary mode
+        num_segments (int): number of x1, y1, x2, y2 rows in the file
+    """
+    f.seek(0)
+    np.lib.format.write_array_header_1_0(
+        f,
+        {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+            "fortran_order": False,
+            "shape": (num_segments, 4),
+        },
+    )
+
+
+def stream_inner_distances(
+    path, rectangle: Rectangle, chunk_size: int = 2**16, output=None
+) -> dict:
+    """Calculate the total inner distance of a segment file over a rectangle
+
+    Args:
+        path (str | Path): a CSV, ``.npy`` or raw float64 binary file
+        rectangle (Rectangle): rectangle that contains intersected parts
+        chunk_size (int, optional): segments per chunk. Defaults to 2**16.
+        output (str | Path, optional): file the inner segments are written
+            to, as CSV for the CSV suffixes, as ``.npy`` for that suffix
+            else as raw float64. Defaults to None (not written).
+
+    Returns:
+        dict: number of segments, number of inner segments and their total
+        inner distance
+    """
+    num_segments = num_inner = 0
+    partial_totals = []
+
+    f = open(output, mode="wb") if output is not None else None
+    suffix = Path(output).suffix if output is not None else None
+    csv = suffix in CSV_SUFFIXES
+    try:
+        if suffix == ".npy":
+            _write_npy_header(f, 0)
+
+        for segments in iter_segment_chunks(path, chunk_size):
+            clipped, lengths, hit = clip_segments(segments, rectangle.bounds)
+
+            num_segments += len(segments)
+            num_inner += int(hit.sum())
+            partial_totals.append(math.fsum(lengths.tolist()))
+
+            if f is not None:
+                write_segments(clipped[hit], f, csv)
+
+        if suffix == ".npy":
+            _write_npy_header(f, num_inner)
+    finally:
+        if f is not None:
+            f.close()
+
+    return {
+        "segments": num_segments,
+        "inner_segments": num_inner,
+        "total_inner_distance": round(math.fsum(partial_totals), 2),
+    }
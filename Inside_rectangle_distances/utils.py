@@ -1,6 +1,12 @@
 import math
+from concurrent.futures import Executor
 
+import numpy as np
+import parallel
+from clipping import clip_segments, segments_from_lines
 from core import Line, Point, Rectangle
+from regions import ClipRegion
+from spatial import RectangleIndex
 
 
 def make_rectangle(points: list[Point]):
@@ -33,9 +39,12 @@ def intersection(line1: Line, line2: Line):
     Returns:
         Point: return the intersection point if it exists else return None
     """
-    D = line1.coef["A"] * line2.coef["B"] - line1.coef["B"] * line2.coef["A"]
-    Dx = line1.coef["C"] * line2.coef["B"] - line1.coef["B"] * line2.coef["C"]
-    Dy = line1.coef["A"] * line2.coef["C"] - line1.coef["C"] * line2.coef["A"]
+    A1, B1, C1 = line1.coefficients
+    A2, B2, C2 = line2.coefficients
+
+    D = A1 * B2 - B1 * A2
+    Dx = C1 * B2 - B1 * C2
+    Dy = A1 * C2 - C1 * A2
     if D != 0:
         x = Dx / D
         y = Dy / D
@@ -58,55 +67,98 @@ def calculate_distance(point1: Point, point2: Point) -> float:
     return dist
 
 
-# TODO: create wrapper method for decoration
+def _inner_lines(
+    lines: tuple[Line],
+    rectangle: Rectangle,
+    workers: int = 1,
+    executor: Executor = None,
+) -> tuple[list, float]:
+    """Clip lines to a rectangle with the vectorized engine
+
+    Args:
+        lines (tuple[Line]): lines to be clipped
+        rectangle (Rectangle): rectangle to clip to
+        workers (int, optional): number of processes. Defaults to 1.
+        executor (Executor, optional): process pool to clip in.
+            Defaults to None (started per call when workers > 1).
+
+    Returns:
+        tuple[list, float]: the inner line or None of each line and their
+        total inner length
+    """
+    segments = segments_from_lines(lines)
+    clipped, _, hit, total = parallel.inner_distances(
+        segments, rectangle.bounds, workers, executor=executor
+    )
+
+    inner_lines = []
+    for line, segment, clipped_segment, is_hit in zip(lines, segments, clipped, hit):
+        if not is_hit:
+            inner_lines.append(None)
+
+        # Both line's points are inside the rectangle
+        elif np.array_equal(segment, clipped_segment):
+            inner_lines.append(line)
+
+        else:
+            x1, y1, x2, y2 = clipped_segment.tolist()
+            inner_lines.append(line.with_points(Point(x1, y1), Point(x2, y2)))
+
+    return inner_lines, total
+
+
+def _region_inner_lines(lines: tuple[Line], region: ClipRegion) -> tuple[list, float]:
+    """Clip lines to a region, a line can have many inner pieces
+
+    Args:
+        lines (tuple[Line]): lines to be clipped
+        region (ClipRegion): region to clip to
+
+    Returns:
+        tuple[list, float]: the inner pieces of the lines and their total
+        inner length
+    """
+    segments = segments_from_lines(lines)
+    pieces, lengths, indices = region.clip(segments)
+
+    inner_lines = []
+    for piece, i in zip(pieces.tolist(), indices.tolist()):
+        line = lines[i]
+
+        if piece == segments[i].tolist():
+            inner_lines.append(line)
+        else:
+            x1, y1, x2, y2 = piece
+            inner_lines.append(line.with_points(Point(x1, y1), Point(x2, y2)))
+
+    return inner_lines, math.fsum(lengths.tolist())
+
+
 def intersected_line(
     line: Line,
     rectangle: Rectangle,
     checking_point: Point = None,
     inner_point: Point = None,
 ) -> Line:
-
     """Intersect the line with rectangle's lines
 
     Args:
         line (Line): the desired line to find its intersection points
         rectangle (Rectangle): rectangle
-        checking_point (Point, optional): outer line's point. Defaults to Point | None.
+        checking_point (Point, optional): unused, the clipping finds which
+            endpoints are inside itself. Defaults to None.
+        inner_point (Point, optional): unused. Defaults to None.
 
     Returns:
         Line: the section of line that lie inside of the rectangle
     """
+    clipped, _, hit = clip_segments(segments_from_lines([line]), rectangle.bounds)
 
-    # List to hold the intersection points
-    inter_points = []
-
-    for rec_line in rectangle.lines:
-        x, y = intersection(line1=line, line2=rec_line)
-
-        inter_point = Point(x, y)
-
-        if rectangle.is_inner(inter_point):
-            inter_points.append(inter_point)
-
-    if not inter_points:
+    if not hit[0]:
         return None
 
-    if isinstance(checking_point, Point):
-        # Find the distance between outer point and the
-        # both intersected points
-        # and select the lower distance
-
-        dist1 = calculate_distance(checking_point, inter_points[0])
-        dist2 = calculate_distance(checking_point, inter_points[1])
-
-        line = Line(*inter_points)
-        if dist1 > dist2:
-            inter_points = (inner_point, inter_points[1])
-
-        elif dist1 < dist2:
-            inter_points = (inner_point, inter_points[0])
-
-    return Line(*inter_points)
+    x1, y1, x2, y2 = clipped[0].tolist()
+    return line.with_points(Point(x1, y1), Point(x2, y2))
 
 
 def location(line: Line, rectangle: Rectangle) -> Line:
@@ -119,50 +171,81 @@ def location(line: Line, rectangle: Rectangle) -> Line:
     Returns:
         Line: a new line the locate inside the rectangle
     """
+    inner_lines, _ = _inner_lines([line], rectangle)
+    return inner_lines[0]
 
-    IS_POINT1_INNER = rectangle.is_inner(line.point1)
-    IS_POINT2_INNER = rectangle.is_inner(line.point2)
 
-    # Both line's points are inside the rectangle
-    if IS_POINT1_INNER and IS_POINT2_INNER:
-        return line
+def calculate_inner_distances(
+    lines: tuple[Line],
+    rectangle: Rectangle | ClipRegion,
+    workers: int = 1,
+    executor: Executor = None,
+) -> tuple[list[Line], float]:
+    """Calculate the inner distances for the intersected lines over rectangle
 
-    # One of the points is outside
-    elif IS_POINT1_INNER and not IS_POINT2_INNER:
+    Only the clipping runs in the worker processes, the lines are turned
+    into arrays and the inner lines built back in this process. Segments
+    already held in an array skip that round trip through
+    parallel.inner_distances.
 
-        # pass outer line outer point for calculate the distance
-        return intersected_line(
-            line, rectangle, checking_point=line.point2, inner_point=line.point1
-        )
+    Args:
+        lines (tuple[Line]): lines to be calculated its intersected parts
+        rectangle (Rectangle | ClipRegion): rectangle, or any clipping region
+            such as a convex polygon, that contains intersected parts
+        workers (int, optional): number of processes the lines are clipped
+            in, only used for rectangles. Defaults to 1.
+        executor (Executor, optional): process pool the lines are clipped
+            in, only used for rectangles. Defaults to None (started per
+            call when workers > 1).
 
-    elif not IS_POINT1_INNER and IS_POINT2_INNER:
-        # pass outer line outer point for calculate the distance
-        return intersected_line(
-            line, rectangle, checking_point=line.point1, inner_point=line.point2
+    Returns:
+        tuple[list[Line], float]: tuple of new inner lines and their total distance
+    """
+    if isinstance(rectangle, ClipRegion):
+        inner_lines, total_inner_distance = _region_inner_lines(lines, rectangle)
+    else:
+        inner_lines, total_inner_distance = _inner_lines(
+            lines, rectangle, workers, executor
         )
 
-    elif not IS_POINT1_INNER and not IS_POINT2_INNER:
-        return intersected_line(line, rectangle)
+    inner_lines = [inner_line for inner_line in inner_lines if inner_line is not None]
 
+    total_inner_distance = round(total_inner_distance, 2)
 
-def calculate_inner_distances(
-    lines: tuple[Line], rectangle: Rectangle
-) -> tuple[list[Line], float]:
-    """Calculate the inner distances for the intersected lines over rectangle
+    return inner_lines, total_inner_distance
+
+
+def calculate_inner_distances_many(
+    lines: tuple[Line], rectangles: list[Rectangle], index: RectangleIndex = None
+) -> list[float]:
+    """Calculate the total inner distance of many lines over many rectangles
+
+    Each line is only clipped against the rectangles the spatial index
+    returns as candidates instead of against every rectangle.
 
     Args:
         lines (tuple[Line]): lines to be calculated its intersected parts
-        rectangle (Rectangle): rectangle that contains intersected parts
+        rectangles (list[Rectangle]): rectangles that contain intersected parts
+        index (RectangleIndex, optional): prebuilt index over the rectangles.
+            Defaults to None (built here).
 
     Returns:
-        tuple[list[Line], float]: tuple of new inner lines and their total distance
+        list[float]: total inner distance of each rectangle
     """
+    if index is None:
+        index = RectangleIndex(rectangles)
 
-    inner_lines = [location(line, rectangle) for line in lines]
+    # Group the lines by candidate rectangle, then clip each group at once
+    segments = segments_from_lines(lines)
+    candidate_lines = [[] for _ in rectangles]
 
-    inner_lines = [inner_line for inner_line in inner_lines if inner_line is not None]
+    for line_index, line in enumerate(lines):
+        for i in index.candidates(line):
+            candidate_lines[i].append(line_index)
 
-    total_inner_distance = sum([inner_line.distance for inner_line in inner_lines])
-    total_inner_distance = round(total_inner_distance, 2)
+    totals = []
+    for rectangle, line_indices in zip(rectangles, candidate_lines):
+        _, lengths, _ = clip_segments(segments[line_indices], rectangle.bounds)
+        totals.append(round(math.fsum(lengths.tolist()), 2))
 
-    return inner_lines, total_inner_distance
+    return totals
@@ -0,0 +1,183 @@
+import collections
+
+
+class SubsetAggregateCache:
+    """Memoized aggregates of spaces combinations keyed by a space bitmask
+
+    A combination of k spaces is its first k - 1 spaces plus its last
+    one, so its OR'd availability, time span and cancellable count are
+    derived from that prefix in O(1). Entries are kept in an LRU of at
+    most ``maxsize`` items so memory stays capped; an evicted prefix is
+    simply derived again from its own prefix. Combinations generated by
+    iter_combinations come with their bitmask, so they skip the name
+    lookups of key.
+    """
+
+    def __init__(
+        self,
+        time_ranges: dict,
+        encs: dict = None,
+        cancellable: dict = None,
+        maxsize: int = 2**16,
+    ):
+        """
+        Args:
+            time_ranges (dict): time range of each space
+            encs (dict, optional): encoded bit row of each space.
+                Defaults to None (OR'd availability stays 0).
+            cancellable (dict, optional): whether each space is cancellable.
+                Defaults to None (no cancellable spaces).
+            maxsize (int, optional): max number of cached combinations.
+                Defaults to 2**16.
+        """
+        encs = encs or {}
+        cancellable = cancellable or {}
+
+        self.spaces = list(time_ranges)
+        self._positions = {space: i for i, space in enumerate(self.spaces)}
+        self._encs = [encs.get(space, 0) for space in self.spaces]
+        self._time_ranges = [time_ranges[space] for space in self.spaces]
+        self._cancellable = [int(bool(cancellable.get(space))) for space in self.spaces]
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = collections.OrderedDict()
+
+    def key(self, combination) -> int:
+        """Get the bitmask of a combination
+
+        Args:
+            combination (Iterable[str]): spaces names
+
+        Returns:
+            int: bitmask where bit i is set if the i-th space is included
+        """
+        mask = 0
+        for space in combination:
+            mask |= 1 << self._positions[space]
+
+        return mask
+
+    def iter_combinations(self, max_size: int = None, extend=None):
+        """Walk the spaces combinations depth first, extending the bitmask
+        of each prefix by one bit
+
+        A combination rejected by extend is still yielded, only its
+        supersets sharing it as a prefix are skipped.
+
+        Args:
+            max_size (int, optional): max number of spaces in a combination.
+                Defaults to None (no cap).
+            extend (Callable[[int], bool], optional): called with the bitmask
+                of each combination, right after it's yielded, to tell if it
+                should be extended. Defaults to None (always extended).
+
+        Yields:
+            tuple[tuple, int]: combination and its bitmask, in lexicographic
+            order
+        """
+        spaces = self.spaces
+        if max_size is None:
+            max_size = len(spaces)
+
+        # Each entry holds (combination, bitmask, index of next space)
+        stack = [((), 0, 0)]
+
+        while stack:
+            combination, mask, start = stack.pop()
+
+            if combination:
+                yield combination, mask
+
+                if len(combination) >= max_size:
+                    continue
+
+                if extend is not None and not extend(mask):
+                    continue
+
+            # Push in reverse so combinations come out in lexicographic order
+            for i in range(len(spaces) - 1, start - 1, -1):
+                stack.append((combination + (spaces[i],), mask | 1 << i, i + 1))
+
+    def get(self, combination) -> tuple[int, int, int]:
+        """Get the aggregates of a combination
+
+        Args:
+            combination (Iterable[str]): spaces names
+
+        Returns:
+            tuple[int, int, int]: OR'd bit row, summed time range and number
+            of cancellable spaces
+        """
+        return self.get_mask(self.key(combination))
+
+    def get_mask(self, mask: int) -> tuple[int, int, int]:
+        """Get the aggregates of a combination from its bitmask
+
+        Args:
+            mask (int): combination bitmask
+
+        Returns:
+            tuple[int, int, int]: OR'd bit row, summed time range and number
+            of cancellable spaces
+        """
+        if not mask:
+            return 0, 0, 0
+
+        aggregate = self._cache.get(mask)
+        if aggregate is not None:
+            self.hits += 1
+            self._cache.move_to_end(mask)
+            return aggregate
+
+        self.misses += 1
+
+        # The prefix is the combination without its last space
+        last = mask.bit_length() - 1
+        enc, time_span, num_cancellable = self.get_mask(mask ^ (1 << last))
+
+        aggregate = (
+            enc | self._encs[last],
+            time_span + self._time_ranges[last],
+            num_cancellable + self._cancellable[last],
+        )
+
+        self._cache[mask] = aggregate
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+        return aggregate
+
+    def aggregate(self, combinations) -> tuple[list, list, list]:
+        """Get the scoring inputs of many combinations
+
+        Args:
+            combinations (Iterable[Iterable[str]]): spaces combinations
+
+        Returns:
+            tuple[list, list, list]: time spans, cancellable counts and
+            number of spaces of each combination, ready for cal_scores
+        """
+        return self.aggregate_masks(map(self.key, combinations))
+
+    def aggregate_masks(self, masks) -> tuple[list, list, list]:
+        """Get the scoring inputs of many combinations from their bitmasks
+
+        Args:
+            masks (Iterable[int]): combinations bitmasks
+
+        Returns:
+            tuple[list, list, list]: time spans, cancellable counts and
+            number of spaces of each combination, ready for cal_scores
+        """
+        time_spans, cancellable_spaces, spaces = [], [], []
+
+        for mask in masks:
+            _, time_span, num_cancellable = self.get_mask(mask)
+
+            time_spans.append(time_span)
+            cancellable_spaces.append(num_cancellable)
+            spaces.append(mask.bit_count())
+
+        return time_spans, cancellable_spaces, spaces
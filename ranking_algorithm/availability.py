@@ -0,0 +1,384 @@
+import collections
+import datetime
+
+import numpy as np
+import utils
+
+
+class AvailabilityIndex:
+    """In-memory availability of spaces that is updated one interval at a time
+
+    Every (space, date) pair holds the same ``enc``/``time_range`` row
+    ``encode_time_range`` produces, so a single reservation change only
+    touches its own row and the cached total of its space.
+    """
+
+    def __init__(self, slot_minutes: int = 60):
+        # Validate the slot size once
+        utils.slots_per_day(slot_minutes)
+
+        self.slot_minutes = slot_minutes
+        self._rows = {}
+        self._totals = collections.Counter()
+
+        # Bumped on every change so readers can tell their caches are stale
+        self.version = 0
+
+    @classmethod
+    def from_spaces_data(
+        cls, spaces_data: dict, slot_minutes: int = 60
+    ) -> "AvailabilityIndex":
+        """Build the index from the raw spaces' details
+
+        Args:
+            spaces_data (dict): spaces' details
+            slot_minutes (int, optional): slot size in minutes. Defaults to 60.
+
+        Returns:
+            AvailabilityIndex: a new filled index
+        """
+        index = cls(slot_minutes)
+
+        for space, details in spaces_data.items():
+            for available_date in details["available_dates"]:
+                index.add_interval(
+                    space, available_date["start"], available_date["end"]
+                )
+
+        return index
+
+    @classmethod
+    def from_encoded(
+        cls, encoded_time: dict, slot_minutes: int = 60
+    ) -> "AvailabilityIndex":
+        """Build the index from the output of encode_time_range
+
+        Args:
+            encoded_time (dict): encoded time for each space-date pair
+            slot_minutes (int, optional): slot size the data was encoded with.
+                Defaults to 60.
+
+        Returns:
+            AvailabilityIndex: a new filled index
+        """
+        index = cls(slot_minutes)
+
+        for space, encoded_dates in encoded_time.items():
+            for date_as_key, encoded_date in encoded_dates.items():
+                date = datetime.datetime.strptime(date_as_key, "%d/%m/%Y").date()
+                index._update(space, date, encoded_date["enc"])
+
+        return index
+
+    def _update(self, space: str, date: datetime.date, enc: int) -> dict:
+        """Replace the bit row of a space-date pair and its cached totals
+
+        Args:
+            space (str): space name
+            date (datetime.date): row date
+            enc (int): the new encoded bit row
+
+        Returns:
+            dict: the updated row, None if it has no free slots left
+        """
+        key = (space, date)
+        row = self._rows.get(key)
+        old_time_range = row["time_range"] if row else 0
+        self.version += 1
+
+        if enc:
+            row = {"enc": enc, "time_range": utils.popcount(enc)}
+            self._rows[key] = row
+        else:
+            # Drop rows without free slots to keep the index small
+            self._rows.pop(key, None)
+            row = None
+
+        self._totals[space] += (row["time_range"] if row else 0) - old_time_range
+
+        return row
+
+    def add_interval(
+        self, space: str, start: datetime.datetime, end: datetime.datetime
+    ) -> dict:
+        """Mark an interval of a space as free
+
+        Args:
+            space (str): space name
+            start (datetime.datetime): interval start
+            end (datetime.datetime): interval end
+
+        Returns:
+            dict: the updated row of the interval's date
+        """
+        date = start.date()
+        mask = utils.interval_mask(start, end, self.slot_minutes)
+
+        return self._update(space, date, self.get_enc(space, date) | mask)
+
+    def remove_interval(
+        self, space: str, start: datetime.datetime, end: datetime.datetime
+    ) -> dict:
+        """Mark an interval of a space as no longer free (e.g. reserved)
+
+        Args:
+            space (str): space name
+            start (datetime.datetime): interval start
+            end (datetime.datetime): interval end
+
+        Returns:
+            dict: the updated row of the interval's date, None if the date
+            has no free slots left
+        """
+        date = start.date()
+        mask = utils.interval_mask(start, end, self.slot_minutes)
+
+        return self._update(space, date, self.get_enc(space, date) & ~mask)
+
+    def get_enc(self, space: str, date: datetime.date) -> int:
+        """Get the encoded bit row of a space-date pair
+
+        Args:
+            space (str): space name
+            date (datetime.date): row date
+
+        Returns:
+            int: encoded bit row, 0 if the space is not free on the date
+        """
+        row = self._rows.get((space, date))
+
+        return row["enc"] if row else 0
+
+    def total(self, space: str) -> int:
+        """Get the cached number of free slots of a space over all dates
+
+        Args:
+            space (str): space name
+
+        Returns:
+            int: total time range
+        """
+        return self._totals[space]
+
+    def time_ranges(self, date: datetime.date, spaces=None) -> dict:
+        """Get the time range of each space on a date
+
+        Args:
+            date (datetime.date): the date to look up
+            spaces (Iterable[str], optional): spaces to include.
+                Defaults to None (every indexed space).
+
+        Returns:
+            dict: time range of each space that is free on the date
+        """
+        if spaces is None:
+            spaces = self.spaces
+
+        time_ranges = {}
+        for space in spaces:
+            row = self._rows.get((space, date))
+            if row:
+                time_ranges[space] = row["time_range"]
+
+        return time_ranges
+
+    def iter_time_ranges(self):
+        """Iterate the time range of every indexed space-date pair
+
+        Yields:
+            tuple[str, datetime.date, int]: space, date and time range
+        """
+        for (space, date), row in self._rows.items():
+            yield space, date, row["time_range"]
+
+    def query(self, space_set, date_range: tuple) -> dict:
+        """Combine the availability of spaces over a range of dates
+
+        Args:
+            space_set (Iterable[str]): spaces to combine
+            date_range (tuple[datetime.date, datetime.date]): first and last
+                dates, both included
+
+        Returns:
+            dict: OR'd bit row and its time range for each date where any
+            of the spaces is free
+        """
+        space_set = tuple(space_set)
+        first_date, last_date = date_range
+
+        combined = {}
+        date = first_date
+        while date <= last_date:
+            enc = utils.union_masks(self.get_enc(space, date) for space in space_set)
+
+            if enc:
+                combined[date.strftime("%d/%m/%Y")] = {
+                    "enc": enc,
+                    "time_range": utils.popcount(enc),
+                }
+
+            date += datetime.timedelta(days=1)
+
+        return combined
+
+    @property
+    def spaces(self) -> list[str]:
+        """Returns the indexed spaces
+
+        Returns:
+            list[str]: spaces names
+        """
+        return list(self._totals)
+
+    @property
+    def dates(self) -> list[datetime.date]:
+        """Returns the dates any space is free on
+
+        Returns:
+            list[datetime.date]: sorted dates
+        """
+        return sorted({date for _, date in self._rows})
+
+    def to_encoded(self) -> dict:
+        """Export the index in the layout encode_time_range produces
+
+        Returns:
+            dict: encoded time for each space-date pair
+        """
+        encoded_time = collections.defaultdict(dict)
+
+        for (space, date), row in sorted(self._rows.items()):
+            encoded_time[space][date.strftime("%d/%m/%Y")] = dict(row)
+
+        return encoded_time
+
+
+class DateRangeTotals:
+    """Prefix sums of each space's daily time range over a run of dates
+
+    Column ``j`` of the prefix matrix holds the total time range of the
+    dates before the ``j``-th one, so the total over any window is one
+    subtraction per space however long the window is. It is a snapshot,
+    rebuild it after the availability changes.
+    """
+
+    def __init__(self, spaces: list, first_date: datetime.date, daily: np.ndarray):
+        """
+        Args:
+            spaces (list): spaces names, one per row of daily
+            first_date (datetime.date): the date of the first column of daily
+            daily (np.ndarray): time range of each space (rows) on each
+                consecutive date (columns)
+        """
+        self.spaces = list(spaces)
+        self.first_date = first_date
+        self.num_days = daily.shape[1]
+
+        self._prefix = np.zeros((len(self.spaces), self.num_days + 1), dtype=np.int64)
+        np.cumsum(daily, axis=1, out=self._prefix[:, 1:])
+
+    @classmethod
+    def from_encoded(cls, encoded_items) -> "DateRangeTotals":
+        """Build the prefix sums from the output of encode_time_range
+
+        Args:
+            encoded_items (Iterable[tuple[str, dict]]): space name and its
+                encoded time for each date, e.g. encode_time_range(...).items()
+
+        Returns:
+            DateRangeTotals: prefix sums over every date from the first
+            to the last encoded one
+        """
+        rows = {}
+        for space, encoded_dates in encoded_items:
+            rows[space] = {}
+            for date_as_key, encoded_date in encoded_dates.items():
+                date = datetime.datetime.strptime(date_as_key, "%d/%m/%Y").date()
+                rows[space][date] = encoded_date["time_range"]
+
+        return cls._from_rows(rows)
+
+    @classmethod
+    def from_index(cls, index: AvailabilityIndex) -> "DateRangeTotals":
+        """Build the prefix sums from an availability index
+
+        Args:
+            index (AvailabilityIndex): the index to snapshot
+
+        Returns:
+            DateRangeTotals: prefix sums over every date from the first
+            to the last indexed one
+        """
+        rows = {space: {} for space in index.spaces}
+        for space, date, time_range in index.iter_time_ranges():
+            rows[space][date] = time_range
+
+        return cls._from_rows(rows)
+
+    @classmethod
+    def _from_rows(cls, rows: dict) -> "DateRangeTotals":
+        dates = [date for space_rows in rows.values() for date in space_rows]
+        if not dates:
+            return cls(list(rows), datetime.date.min, np.zeros((len(rows), 0)))
+
+        first_date = min(dates)
+        num_days = (max(dates) - first_date).days + 1
+
+        daily = np.zeros((len(rows), num_days), dtype=np.int64)
+        for i, space_rows in enumerate(rows.values()):
+            for date, time_range in space_rows.items():
+                daily[i, (date - first_date).days] = time_range
+
+        return cls(list(rows), first_date, daily)
+
+    def _column(self, date: datetime.date) -> int:
+        # Clamp to the covered dates, outside them every space has 0
+        return min(max((date - self.first_date).days, 0), self.num_days)
+
+    def window(self, date_range: tuple) -> dict:
+        """Get the total time range of each space over a window of dates
+
+        Args:
+            date_range (tuple[datetime.date, datetime.date]): first and last
+                dates, both included
+
+        Returns:
+            dict: total time range of each space
+        """
+        first_date, last_date = date_range
+        start = self._column(first_date)
+        stop = max(self._column(last_date + datetime.timedelta(days=1)), start)
+
+        totals = self._prefix[:, stop] - self._prefix[:, start]
+
+        return dict(zip(self.spaces, totals.tolist()))
+
+    def rank(
+        self,
+        date_range: tuple,
+        target: int,
+        k: int = 10,
+        cancellable: dict = None,
+        max_size: int = None,
+        tolerance: int = None,
+    ) -> list[tuple[float, tuple]]:
+        """Rank the spaces combinations against a target over a window
+
+        Args:
+            date_range (tuple[datetime.date, datetime.date]): first and last
+                dates, both included
+            target (int): the target time value to be obtained over the window
+            k (int, optional): number of combinations to keep. Defaults to 10.
+            cancellable (dict, optional): whether each space is cancellable.
+                Defaults to None (no cancellable spaces).
+            max_size (int, optional): max number of spaces in a combination.
+                Defaults to None (no cap).
+            tolerance (int, optional): allowed excess over the target before
+                pruning. Defaults to None (no pruning).
+
+        Returns:
+            list[tuple[float, tuple]]: best scores and their combinations
+        """
+        return utils.rank_date(
+            self.window(date_range), target, k, cancellable, max_size, tolerance
+        )
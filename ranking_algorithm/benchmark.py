@@ -0,0 +1,364 @@
+"""
+Benchmark the ranking pipeline on synthetic reservation data
+"""
+
+import argparse
+import datetime
+import functools
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import core
+import dateutil.parser
+import numpy as np
+import parallel
+import parsing
+
+
+def generate_reservations(
+    num_spaces: int,
+    num_days: int,
+    intervals_per_day: int = 2,
+    seed: int = 0,
+    cancellable_ratio: float = 0.0,
+) -> dict:
+    """Generate synthetic spaces' details in the fixtures layout
+
+    Args:
+        num_spaces (int): number of spaces
+        num_days (int): number of days every space has availability on
+        intervals_per_day (int, optional): free intervals of a space per day,
+            at most 12. Defaults to 2.
+        seed (int, optional): random seed. Defaults to 0.
+        cancellable_ratio (float, optional): share of cancellable spaces.
+            Defaults to 0.0.
+
+    Raises:
+        ValueError: if intervals_per_day isn't between 0 and 12
+
+    Returns:
+        dict: spaces' details with ISO-8601 start/end strings
+    """
+    # Every interval needs two distinct hour boundaries out of 25
+    if not 0 <= intervals_per_day <= 12:
+        raise ValueError(
+            f"intervals_per_day must be between 0 and 12, got {intervals_per_day}"
+        )
+
+    rng = random.Random(seed)
+    first_date = datetime.datetime(2022, 1, 1)
+
+    spaces_data = {}
+    for space_number in range(num_spaces):
+        available_dates = []
+
+        for day in range(num_days):
+            date = first_date + datetime.timedelta(days=day)
+
+            # Pick distinct hour boundaries so the intervals of a day don't overlap
+            hours = sorted(rng.sample(range(25), 2 * intervals_per_day))
+            for start_hour, end_hour in zip(hours[::2], hours[1::2]):
+                start = date + datetime.timedelta(hours=start_hour)
+                end = date + datetime.timedelta(hours=end_hour)
+
+                # Keep intervals inside their day like the fixtures do
+                if end_hour == 24:
+                    end -= datetime.timedelta(minutes=1)
+
+                available_dates.append(
+                    {"start": start.isoformat(), "end": end.isoformat()}
+                )
+
+        spaces_data[f"S{space_number}"] = {"available_dates": available_dates}
+
+        if cancellable_ratio:
+            spaces_data[f"S{space_number}"]["cancellable"] = (
+                rng.random() < cancellable_ratio
+            )
+
+    return spaces_data
+
+
+def decode_date_time_dateutil(space_dict) -> dict:
+    """Decode string dates with dateutil only, the baseline for the fast path
+
+    Args:
+        space_dict (dict): space's date dict
+
+    Returns:
+        dict: a new formatted space dict
+    """
+    if "start" in space_dict:
+        space_dict["start"] = dateutil.parser.parse(space_dict["start"])
+
+    if "end" in space_dict:
+        space_dict["end"] = dateutil.parser.parse(space_dict["end"])
+
+    return space_dict
+
+
+def bench_parsing(num_intervals: int = 1_000_000, repeat: int = 1) -> dict:
+    """Compare the load throughput of the date time decoders
+
+    Args:
+        num_intervals (int, optional): number of intervals in the synthetic
+            fixture. Defaults to 1_000_000.
+        repeat (int, optional): runs per decoder, the best one is reported.
+            Defaults to 1.
+
+    Returns:
+        dict: seconds and intervals per second of each decoder
+    """
+    num_spaces = max(1, num_intervals // (365 * 2))
+    num_days = max(1, num_intervals // (num_spaces * 2))
+    spaces_data = generate_reservations(num_spaces, num_days, intervals_per_day=2)
+    num_intervals = num_spaces * num_days * 2
+
+    decoders = {
+        "dateutil": decode_date_time_dateutil,
+        "fromisoformat": parsing.decode_date_time,
+        "fromisoformat_memo": functools.partial(parsing.decode_date_time, memoize=True),
+    }
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(spaces_data, f)
+        path = f.name
+
+    results = {"intervals": num_intervals, "decoders": {}}
+    try:
+        for name, decoder in decoders.items():
+            best = float("inf")
+
+            for _ in range(repeat):
+                parsing.cached_parse_date_time.cache_clear()
+
+                start = time.perf_counter()
+                with open(path, mode="r") as f:
+                    json.load(f, object_hook=decoder)
+                best = min(best, time.perf_counter() - start)
+
+            results["decoders"][name] = {
+                "seconds": round(best, 4),
+                "intervals_per_sec": round(num_intervals / best),
+            }
+    finally:
+        os.remove(path)
+
+    return results
+
+
+# Values split at every offset by the streaming parser's chunk boundaries
+PARSER_CHECK_DOCUMENTS = (
+    '{"a": 12345, "b": [1,2,3], "c": 1.5e10}',
+    ' { "x" : -0.5E-3 , "y": {"z": [true, false, null, "q\\"}"]}, "w": 7 } ',
+    "{}",
+)
+
+
+def check_json_object_items(documents: tuple = PARSER_CHECK_DOCUMENTS) -> dict:
+    """Check the streaming JSON parser against json.loads at every chunk size
+
+    Args:
+        documents (tuple, optional): JSON objects to parse. Defaults to
+            PARSER_CHECK_DOCUMENTS.
+
+    Returns:
+        dict: the chunk sizes each document failed at
+    """
+    results = {"documents": [], "ok": True}
+
+    for document in documents:
+        expected = json.loads(document)
+        failed = []
+
+        for chunk_size in range(1, len(document) + 1):
+            items = parsing.iter_json_object_items(
+                io.StringIO(document), chunk_size=chunk_size
+            )
+            try:
+                if dict(items) != expected:
+                    failed.append(chunk_size)
+            except json.JSONDecodeError:
+                failed.append(chunk_size)
+
+        results["documents"].append({"length": len(document), "failed": failed})
+        results["ok"] &= not failed
+
+    return results
+
+
+def measure(stage, *args) -> tuple:
+    """Time a pipeline stage, then run it again under tracemalloc
+
+    The stages are pure, so the second run only measures the peak memory
+    without the tracing overhead leaking into the timing.
+
+    Args:
+        stage (Callable): the stage function
+        *args: the stage arguments
+
+    Returns:
+        tuple: stage result, seconds and peak traced memory in bytes
+    """
+    start = time.perf_counter()
+    result = stage(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        stage(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, seconds, peak
+
+
+def bench_pipeline(
+    num_spaces: int = 12,
+    num_days: int = 30,
+    intervals_per_day: int = 2,
+    cancellable_ratio: float = 0.3,
+    target: int = 24,
+    max_size: int = None,
+    seed: int = 0,
+    k: int = 10,
+) -> dict:
+    """Time each stage of the ranking pipeline on a synthetic dataset
+
+    The ranking stage runs the same parallel.rank_dates call as core.run,
+    its items are the combinations scored over every date.
+
+    Args:
+        num_spaces (int, optional): number of spaces. Defaults to 12.
+        num_days (int, optional): number of days. Defaults to 30.
+        intervals_per_day (int, optional): free intervals of a space per day.
+            Defaults to 2.
+        cancellable_ratio (float, optional): share of cancellable spaces.
+            Defaults to 0.3.
+        target (int, optional): the target time value to be obtained.
+            Defaults to 24.
+        max_size (int, optional): max number of spaces in a combination.
+            Defaults to None (no cap).
+        seed (int, optional): random seed. Defaults to 0.
+        k (int, optional): number of combinations to keep. Defaults to 10.
+
+    Returns:
+        dict: dataset parameters and seconds, items, throughput and peak
+        memory of each stage
+    """
+    spaces_data = generate_reservations(
+        num_spaces, num_days, intervals_per_day, seed, cancellable_ratio
+    )
+    text = json.dumps(spaces_data)
+    num_intervals = num_spaces * num_days * intervals_per_day
+    cancellable = {
+        space: details.get("cancellable", False)
+        for space, details in spaces_data.items()
+    }
+
+    stages = {}
+
+    def record(name: str, num_items: int, seconds: float, peak: int):
+        stages[name] = {
+            "seconds": round(seconds, 6),
+            "items": num_items,
+            "items_per_sec": round(num_items / seconds) if seconds else None,
+            "peak_memory_bytes": peak,
+        }
+
+    parsed, seconds, peak = measure(
+        functools.partial(json.loads, object_hook=parsing.decode_date_time), text
+    )
+    record("parse", num_intervals, seconds, peak)
+
+    encoded_time, seconds, peak = measure(core.encode_time_range, parsed)
+    record("encode_time_range", num_intervals, seconds, peak)
+
+    time_range_matrix, seconds, peak = measure(
+        parallel.build_time_range_matrix, encoded_time.items()
+    )
+    record("build_time_range_matrix", num_spaces * num_days, seconds, peak)
+
+    _, seconds, peak = measure(
+        functools.partial(
+            parallel.rank_dates, k=k, cancellable=cancellable, max_size=max_size
+        ),
+        time_range_matrix,
+        target,
+    )
+    _, _, matrix = time_range_matrix
+    num_combinations = sum(
+        math.comb(int(num_spaces), size)
+        for num_spaces in np.count_nonzero(matrix, axis=0).tolist()
+        for size in range(1, (max_size or num_spaces) + 1)
+    )
+    record("rank_dates", num_combinations, seconds, peak)
+
+    return {
+        "dataset": {
+            "spaces": num_spaces,
+            "days": num_days,
+            "intervals_per_day": intervals_per_day,
+            "cancellable_ratio": cancellable_ratio,
+            "target": target,
+            "max_size": max_size,
+            "seed": seed,
+            "k": k,
+        },
+        "stages": stages,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=None, help="JSON report file")
+    subparsers = parser.add_subparsers(dest="suite", required=True)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="time each stage")
+    pipeline_parser.add_argument("--spaces", type=int, default=12)
+    pipeline_parser.add_argument("--days", type=int, default=30)
+    pipeline_parser.add_argument("--intervals-per-day", type=int, default=2)
+    pipeline_parser.add_argument("--cancellable-ratio", type=float, default=0.3)
+    pipeline_parser.add_argument("--target", type=int, default=24)
+    pipeline_parser.add_argument("--max-size", type=int, default=None)
+    pipeline_parser.add_argument("--seed", type=int, default=0)
+    pipeline_parser.add_argument("--top-k", type=int, default=10)
+
+    parsing_parser = subparsers.add_parser("parsing", help="compare date decoders")
+    parsing_parser.add_argument("--intervals", type=int, default=1_000_000)
+    parsing_parser.add_argument("--repeat", type=int, default=1)
+
+    subparsers.add_parser(
+        "parser-check", help="check the streaming parser at every chunk size"
+    )
+
+    args = parser.parse_args()
+
+    if args.suite == "pipeline":
+        report = bench_pipeline(
+            args.spaces,
+            args.days,
+            args.intervals_per_day,
+            args.cancellable_ratio,
+            args.target,
+            args.max_size,
+            args.seed,
+            args.top_k,
+        )
+    elif args.suite == "parsing":
+        report = bench_parsing(args.intervals, args.repeat)
+    else:
+        report = check_json_object_items()
+
+    if args.output:
+        with open(args.output, mode="w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
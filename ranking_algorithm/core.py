@@ -1,61 +1,159 @@
 import collections
 import json
+from pathlib import Path
 
+import availability
+import parallel
 import parsing
+import profiling
 import utils
 
 
-def encode_time_range(spaces_data: dict) -> dict:
-    """Encode available dates' time for each space
+def encode_space(details: dict, slot_minutes: int = 60) -> dict:
+    """Encode available dates' time of a single space
 
     Args:
-        spaces_data (dict): spaces' details
-        time_span (int): the search range
+        details (dict): space's details
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
 
     Returns:
-        dict: encoded time for each space-date pair
+        dict: encoded time for each date of the space
     """
-    encoded_time = collections.defaultdict(lambda: collections.defaultdict(dict))
+    encoded_dates = collections.defaultdict(lambda: {"enc": 0, "time_range": 0})
 
-    for space, details in spaces_data.items():
-        for available_date in details["available_dates"]:
+    for available_date in details["available_dates"]:
 
-            date_as_key = available_date["start"].date().strftime("%d/%m/%Y")
+        date_as_key = available_date["start"].date().strftime("%d/%m/%Y")
 
-            # If the date doesn't have encoded list of hour bits
-            # Assign 0 bits list
-            if not encoded_time[space][date_as_key].get("enc"):
-                encoded_time[space][date_as_key]["enc"] = [0] * 24
+        # Flip bits where there is free time,
+        # overlapping intervals set the same bits again
+        encoded_dates[date_as_key]["enc"] |= utils.interval_mask(
+            available_date["start"], available_date["end"], slot_minutes
+        )
 
-            # If the date doesn't have time range
-            # Assign 0 to time range
-            if not encoded_time[space][date_as_key].get("time_range"):
-                encoded_time[space][date_as_key]["time_range"] = 0
+    # Find time range each day gives once all its intervals are merged
+    for encoded_date in encoded_dates.values():
+        encoded_date["time_range"] = utils.popcount(encoded_date["enc"])
 
-            # Find time range each day gives
-            time_range = available_date["end"].hour - available_date["start"].hour
-            encoded_time[space][date_as_key]["time_range"] += time_range
+    return dict(encoded_dates)
 
-            # Convert time range to a Slicer
-            time_slice = slice(
-                available_date["start"].hour, available_date["end"].hour + 1, 1
-            )
 
-            # Flip bits where there is free time
-            encoded_time[space][date_as_key]["enc"][time_slice] = [1] * time_range
+@profiling.stage(items=len)
+def encode_time_range(spaces_data: dict, slot_minutes: int = 60) -> dict:
+    """Encode available dates' time for each space
 
-    return encoded_time
+    Each space-date pair holds its free slots as one integer bit row,
+    where bit ``i`` is set when the ``i``-th slot of the day is free,
+    and the number of free slots in that row.
 
+    Args:
+        spaces_data (dict): spaces' details
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
 
-def run(base_path: str):
-    with open(base_path / "fixture/reservations_dummy_data.json", mode="r") as f:
-        spaces_data = json.load(f, object_hook=parsing.decode_date_time)
+    Returns:
+        dict: encoded time for each space-date pair
+    """
+    return dict(iter_encode_time_range(spaces_data.items(), slot_minutes))
 
-    encoded_time = encode_time_range(spaces_data=spaces_data)
 
-    # Save to json file
-    with open(base_path / "fixture/reservations_encoded_data.json", mode="w") as f:
-        json.dump(encoded_time, f, indent=4, cls=parsing.DateTimeEncoder)
+def iter_encode_time_range(spaces_items, slot_minutes: int = 60):
+    """Encode spaces one by one as they are read
+
+    Args:
+        spaces_items (Iterable[tuple[str, dict]]): space name and details pairs
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
+
+    Yields:
+        tuple[str, dict]: space name and its encoded time for each date
+    """
+    for space, details in spaces_items:
+        yield space, encode_space(details, slot_minutes)
+
+
+def _record_cancellable(spaces_items, cancellable: dict):
+    """Pass spaces through, recording whether each one is cancellable"""
+    for space, details in spaces_items:
+        cancellable[space] = details.get("cancellable", False)
+        yield space, details
+
+
+def run(
+    base_path: str,
+    stream: bool = False,
+    target: int = None,
+    k: int = 10,
+    workers: int = 1,
+    window: tuple = None,
+    max_size: int = None,
+    tolerance: int = None,
+    input_path=None,
+):
+    if input_path is None:
+        input_path = base_path / "fixtures/reservations_dummy_data.json"
+
+    output_path = base_path / "fixtures/reservations_encoded_data.json"
+    cancellable = {}
+
+    if stream:
+        # Only one space is held in memory at a time
+        spaces_items = _record_cancellable(parsing.iter_spaces(input_path), cancellable)
+        encoded_spaces = iter_encode_time_range(spaces_items)
+
+        with open(output_path, mode="w") as f:
+            spaces = parsing.dump_items(encoded_spaces, f)
+
+    else:
+        with profiling.trace("parse") as span:
+            if Path(input_path).suffix in parsing.NDJSON_SUFFIXES:
+                spaces_data = dict(parsing.iter_spaces(input_path))
+            else:
+                with open(input_path, mode="r") as f:
+                    spaces_data = json.load(f, object_hook=parsing.decode_date_time)
+
+            span["items"] = len(spaces_data)
+
+        encoded_time = encode_time_range(spaces_data=spaces_data)
+
+        # Save to json file
+        with open(output_path, mode="w") as f, profiling.trace("save"):
+            json.dump(encoded_time, f, indent=4, cls=parsing.DateTimeEncoder)
+
+        spaces = list(encoded_time)
+        cancellable = {
+            space: details.get("cancellable", False)
+            for space, details in spaces_data.items()
+        }
+
+    if target is None:
+        # Print as they are generated, there may be far too many to hold
+        for combination in utils.get_space_combinations(spaces, max_size):
+            print(combination)
+        return
+
+    with open(output_path, mode="r") as f:
+        encoded_items = parsing.iter_json_object_items(f)
+
+        if window is None:
+            ranking = parallel.rank_dates(
+                parallel.build_time_range_matrix(encoded_items),
+                target,
+                k=k,
+                cancellable=cancellable,
+                workers=workers,
+                max_size=max_size,
+                tolerance=tolerance,
+            )
 
-    combinations = utils.get_space_combinations(encoded_time.keys())
-    print(combinations)
+        else:
+            # The target spans the whole window
+            totals = availability.DateRangeTotals.from_encoded(encoded_items)
+            window_key = "-".join(date.strftime("%d/%m/%Y") for date in window)
+            ranking = [
+                (score, window_key, combination)
+                for score, combination in totals.rank(
+                    window, target, k, cancellable, max_size, tolerance
+                )
+            ]
+
+    for score, date_as_key, combination in ranking:
+        print(date_as_key, combination, score)
@@ -1,9 +1,96 @@
+import argparse
+import datetime
 from pathlib import Path
 
+import profiling
 from core import run
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input",
+        default=None,
+        help="reservations JSON or NDJSON file, defaults to the dummy fixture",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read, encode and write the reservations one space at a time",
+    )
+    parser.add_argument(
+        "--target",
+        type=int,
+        default=None,
+        help="rank the spaces combinations of each date against this time range",
+    )
+    parser.add_argument(
+        "--top-k", type=int, default=10, help="number of combinations to keep"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes to split the dates across when ranking",
+    )
+    parser.add_argument(
+        "--window",
+        nargs=2,
+        default=None,
+        metavar=("FIRST", "LAST"),
+        type=lambda date: datetime.datetime.strptime(date, "%d/%m/%Y").date(),
+        help="rank against --target over a dd/mm/YYYY date range",
+    )
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=None,
+        help="max number of spaces in a combination",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=None,
+        help="skip supersets of combinations above --target by more than this "
+        "once they can't reach the top k",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time, calls, items and allocations of each stage",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="write the recorded stages as a Chrome trace JSON file",
+    )
+    args = parser.parse_args()
+
+    if args.tolerance is not None and args.target is None:
+        parser.error("--tolerance needs --target")
+
+    if args.window is not None and args.target is None:
+        parser.error("--window needs --target")
+
+    if args.profile or args.trace_file:
+        profiling.enable(memory=args.profile)
+
     # Build paths inside the project like this: BASE_DIR / 'subdir'.
     BASE_DIR = Path(__file__).resolve().parent
 
-    run(BASE_DIR)
+    run(
+        BASE_DIR,
+        stream=args.stream,
+        target=args.target,
+        k=args.top_k,
+        workers=args.workers,
+        window=args.window,
+        max_size=args.max_size,
+        tolerance=args.tolerance,
+        input_path=args.input,
+    )
+
+    if args.profile:
+        print(profiling.summary())
+
+    if args.trace_file:
+        profiling.dump_chrome_trace(args.trace_file)
@@ -0,0 +1,200 @@
+"""
+Rank the spaces combinations of many dates across worker processes
+"""
+
+import datetime
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import utils
+
+
+def build_time_range_matrix(encoded_items) -> tuple[list, list, np.ndarray]:
+    """Gather the time range of every space-date pair into one matrix
+
+    Args:
+        encoded_items (Iterable[tuple[str, dict]]): space name and its encoded
+            time for each date, as encode_time_range produces
+
+    Returns:
+        tuple[list, list, np.ndarray]: spaces, chronologically sorted dates and
+        a uint16 (num spaces, num dates) matrix
+    """
+    spaces, rows, dates = [], [], set()
+
+    for space, encoded_dates in encoded_items:
+        spaces.append(space)
+        rows.append(
+            {date: encoded["time_range"] for date, encoded in encoded_dates.items()}
+        )
+        dates.update(encoded_dates)
+
+    dates = sorted(dates, key=lambda date: datetime.datetime.strptime(date, "%d/%m/%Y"))
+    date_positions = {date: j for j, date in enumerate(dates)}
+
+    matrix = np.zeros((len(spaces), len(dates)), dtype=np.uint16)
+    for i, row in enumerate(rows):
+        for date, time_range in row.items():
+            matrix[i, date_positions[date]] = time_range
+
+    return spaces, dates, matrix
+
+
+def rank_shard(
+    matrix: np.ndarray,
+    spaces: list,
+    dates: list,
+    target: int,
+    k: int,
+    cancellable: dict,
+    max_size: int,
+    tolerance: int = None,
+) -> list[tuple[float, str, tuple]]:
+    """Rank the spaces combinations of a group of dates
+
+    Args:
+        matrix (np.ndarray): time range of each space (rows) on each date (columns)
+        spaces (list): spaces names, one per matrix row
+        dates (list): dates keys, one per matrix column
+        target (int): the target time value to be obtained
+        k (int): number of combinations to keep
+        cancellable (dict): whether each space is cancellable
+        max_size (int): max number of spaces in a combination
+        tolerance (int, optional): allowed excess over the target before
+            pruning. Defaults to None (no pruning).
+
+    Returns:
+        list[tuple[float, str, tuple]]: best scores with their date and combination
+    """
+    ranking = []
+
+    for j, date_as_key in enumerate(dates):
+        column = matrix[:, j]
+        time_ranges = {spaces[i]: int(column[i]) for i in np.flatnonzero(column)}
+
+        ranking.extend(
+            (score, date_as_key, comb)
+            for score, comb in utils.rank_date(
+                time_ranges, target, k, cancellable, max_size, tolerance
+            )
+        )
+
+    return _top(ranking, k)
+
+
+def _rank_shared_shard(
+    shm_name: str,
+    shape: tuple,
+    start: int,
+    stop: int,
+    spaces: list,
+    dates: list,
+    target: int,
+    k: int,
+    cancellable: dict,
+    max_size: int,
+    tolerance: int,
+) -> list[tuple[float, str, tuple]]:
+    """Attach to the shared time range matrix and rank a range of its dates"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype=np.uint16, buffer=shm.buf)
+    try:
+        return rank_shard(
+            matrix[:, start:stop],
+            spaces,
+            dates,
+            target,
+            k,
+            cancellable,
+            max_size,
+            tolerance,
+        )
+    finally:
+        # Drop the view before closing, numpy holds the buffer otherwise
+        del matrix
+        shm.close()
+
+
+def _top(ranking, k: int) -> list[tuple[float, str, tuple]]:
+    # Ties keep the combination with fewer spaces, then the earlier date
+    return heapq.nlargest(k, ranking, key=lambda item: (item[0], -len(item[2])))
+
+
+def rank_dates(
+    time_range_matrix: tuple[list, list, np.ndarray],
+    target: int,
+    k: int = 10,
+    cancellable: dict = None,
+    workers: int = 1,
+    max_size: int = None,
+    tolerance: int = None,
+) -> list[tuple[float, str, tuple]]:
+    """Rank the spaces combinations of every date and keep the k best
+
+    With more than one worker the dates are split into one contiguous
+    shard per worker, the matrix is placed in shared memory so workers
+    read it in place, and the per-shard top-k are merged.
+
+    Args:
+        time_range_matrix (tuple[list, list, np.ndarray]): spaces, dates and
+            matrix built by build_time_range_matrix
+        target (int): the target time value to be obtained
+        k (int, optional): number of combinations to keep. Defaults to 10.
+        cancellable (dict, optional): whether each space is cancellable.
+            Defaults to None (no cancellable spaces).
+        workers (int, optional): number of processes. Defaults to 1.
+        max_size (int, optional): max number of spaces in a combination.
+            Defaults to None (no cap).
+        tolerance (int, optional): allowed excess over the target before
+            pruning. Defaults to None (no pruning).
+
+    Returns:
+        list[tuple[float, str, tuple]]: best scores with their date and combination
+    """
+    spaces, dates, matrix = time_range_matrix
+    if cancellable is None:
+        cancellable = {}
+
+    if workers <= 1 or len(dates) <= 1:
+        return rank_shard(
+            matrix, spaces, dates, target, k, cancellable, max_size, tolerance
+        )
+
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        shared = np.ndarray(matrix.shape, dtype=np.uint16, buffer=shm.buf)
+        shared[:] = matrix
+        del shared
+
+        num_shards = min(workers, len(dates))
+        bounds = [len(dates) * shard // num_shards for shard in range(num_shards + 1)]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _rank_shared_shard,
+                    shm.name,
+                    matrix.shape,
+                    start,
+                    stop,
+                    spaces,
+                    dates[start:stop],
+                    target,
+                    k,
+                    cancellable,
+                    max_size,
+                    tolerance,
+                )
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+
+            # Merge in shard order so ties resolve like the serial path
+            ranking = [item for future in futures for item in future.result()]
+
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return _top(ranking, k)
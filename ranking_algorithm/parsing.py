@@ -1,8 +1,17 @@
 import datetime
+import functools
+import json
 from json import JSONEncoder
+from pathlib import Path
 
 import dateutil.parser
 
+# Files with these suffixes hold one JSON object per line
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+# Characters a JSON number can go on with
+NUMBER_CHARS = "0123456789+-.eE"
+
 
 class DateTimeEncoder(JSONEncoder):
     # Override the default method
@@ -11,19 +20,194 @@ class DateTimeEncoder(JSONEncoder):
             return obj.isoformat()
 
 
-def decode_date_time(space_dict) -> dict:
+def parse_date_time(value: str) -> datetime.datetime:
+    """Parse a date time string
+
+    Strict ISO-8601 strings take the fast datetime.fromisoformat path,
+    anything else falls back to dateutil's generic parser.
+
+    Args:
+        value (str): date time string
+
+    Returns:
+        datetime.datetime: parsed date time
+    """
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
+# Reservation files repeat the same timestamps a lot (e.g. whole days),
+# datetime objects are immutable so they are safe to share
+cached_parse_date_time = functools.lru_cache(maxsize=2**16)(parse_date_time)
+
+
+def decode_date_time(space_dict, memoize: bool = False) -> dict:
     """Decode string date to be datetime object
 
     Args:
         space_dict (_type_): space's date dict
+        memoize (bool, optional): reuse the parsed value of repeated
+            timestamps. Defaults to False.
 
     Returns:
         dict: a new formatted space dict
     """
+    parse = cached_parse_date_time if memoize else parse_date_time
+
     if "start" in space_dict:
-        space_dict["start"] = dateutil.parser.parse(space_dict["start"])
+        space_dict["start"] = parse(space_dict["start"])
 
     if "end" in space_dict:
-        space_dict["end"] = dateutil.parser.parse(space_dict["end"])
+        space_dict["end"] = parse(space_dict["end"])
 
     return space_dict
+
+
+def iter_json_object_items(
+    f, object_hook=None, chunk_size: int = 2**16, max_retries: int = 64
+):
+    """Incrementally decode the items of a top-level JSON object
+
+    Only the item being decoded is held in memory, the file is read in
+    chunks that grow while a single value doesn't fit in the buffer.
+
+    Args:
+        f (TextIO): file holding a JSON object
+        object_hook (Callable, optional): json object hook. Defaults to None.
+        chunk_size (int, optional): initial read size. Defaults to 2**16.
+        max_retries (int, optional): max refills while decoding a single
+            value, the read size doubles on each one. Defaults to 64.
+
+    Raises:
+        json.JSONDecodeError: if the file isn't a valid JSON object or a
+            value still can't be decoded after max_retries refills
+
+    Yields:
+        tuple[str, Any]: key and decoded value pairs
+    """
+    decoder = json.JSONDecoder(object_hook=object_hook)
+    buffer, position = "", 0
+
+    def read_more(size: int = chunk_size) -> bool:
+        nonlocal buffer, position
+        chunk = f.read(size)
+        if not chunk:
+            return False
+
+        buffer, position = buffer[position:] + chunk, 0
+        return True
+
+    def peek() -> str:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+
+            if position < len(buffer):
+                return buffer[position]
+
+            if not read_more():
+                return ""
+
+    def expect(chars: str) -> str:
+        nonlocal position
+        char = peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", buffer, position)
+
+        position += 1
+        return char
+
+    def decode():
+        nonlocal position
+        size = chunk_size
+        for _ in range(max_retries):
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not read_more(size):
+                    raise
+            else:
+                # Until something that can't continue a number follows
+                # the value, it may go on in the next chunk (12|345, 1.|5)
+                if buffer[end:].lstrip(NUMBER_CHARS) or not read_more(size):
+                    position = end
+                    return value
+
+            # The buffer was refilled from position, decode it again
+            size *= 2
+
+        raise json.JSONDecodeError("Value too large to decode", buffer, position)
+
+    expect("{")
+    if peek() == "}":
+        return
+
+    while True:
+        peek()
+        key = decode()
+        expect(":")
+        peek()
+        yield key, decode()
+
+        if expect(",}") == "}":
+            return
+
+
+def iter_spaces(path, memoize: bool = False):
+    """Read spaces' details one space at a time
+
+    Args:
+        path (str | Path): JSON file holding one object of all spaces, or
+            NDJSON file holding one space per line
+        memoize (bool, optional): reuse the parsed value of repeated
+            timestamps. Defaults to False.
+
+    Yields:
+        tuple[str, dict]: space name and its details
+    """
+    object_hook = functools.partial(decode_date_time, memoize=memoize)
+
+    with open(path, mode="r") as f:
+        if Path(path).suffix in NDJSON_SUFFIXES:
+            for line in f:
+                if line.strip():
+                    yield from json.loads(line, object_hook=object_hook).items()
+
+        else:
+            yield from iter_json_object_items(f, object_hook=object_hook)
+
+
+def dump_items(items, f, ndjson: bool = False) -> list:
+    """Write key and value pairs as they come without holding them all
+
+    Args:
+        items (Iterable[tuple[str, Any]]): key and value pairs
+        f (TextIO): file to write in
+        ndjson (bool, optional): write one object per line instead of
+            a single JSON object. Defaults to False.
+
+    Returns:
+        list: the written keys
+    """
+    encoder = DateTimeEncoder()
+    keys = []
+
+    if not ndjson:
+        f.write("{")
+
+    for key, value in items:
+        if ndjson:
+            f.write(encoder.encode({key: value}) + "\n")
+        else:
+            separator = "," if keys else ""
+            f.write(f"{separator}\n    {encoder.encode(key)}: {encoder.encode(value)}")
+
+        keys.append(key)
+
+    if not ndjson:
+        f.write("\n}\n")
+
+    return keys
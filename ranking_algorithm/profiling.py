@@ -0,0 +1,180 @@
+"""
+Opt-in stage tracing for the ranking pipeline
+
+Tracing is off by default and a decorated function then only pays for
+one flag check. Once enabled, every stage records its wall time, calls,
+processed items and, when memory tracing is on, the tracemalloc delta.
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_enabled = False
+_memory = False
+_stats = collections.defaultdict(
+    lambda: {"calls": 0, "seconds": 0.0, "items": 0, "alloc_bytes": 0}
+)
+_events = []
+
+
+def enable(memory: bool = False):
+    """Start recording stages
+
+    Args:
+        memory (bool, optional): also record allocation deltas with
+            tracemalloc, which slows the traced code down. Defaults to False.
+    """
+    global _enabled, _memory
+
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stop recording stages, the recorded ones are kept"""
+    global _enabled, _memory
+
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    _enabled = False
+    _memory = False
+
+
+def reset():
+    """Forget every recorded stage"""
+    _stats.clear()
+    _events.clear()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+@contextlib.contextmanager
+def trace(name: str, items: int = 0):
+    """Record a block of code as a stage
+
+    Args:
+        name (str): stage name
+        items (int, optional): number of items the stage processes, it can
+            also be set later through the yielded span. Defaults to 0.
+
+    Yields:
+        dict: the span being recorded
+    """
+    span = {"items": items}
+    if not _enabled:
+        yield span
+        return
+
+    memory = _memory and tracemalloc.is_tracing()
+    alloc_start = tracemalloc.get_traced_memory()[0] if memory else 0
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        seconds = time.perf_counter() - start
+        alloc = tracemalloc.get_traced_memory()[0] - alloc_start if memory else 0
+
+        stats = _stats[name]
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["items"] += span["items"]
+        stats["alloc_bytes"] += alloc
+
+        _events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": seconds * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {"items": span["items"], "alloc_bytes": alloc},
+            }
+        )
+
+
+def stage(name: str = None, items=None):
+    """Decorate a function to be recorded as a stage
+
+    Args:
+        name (str, optional): stage name. Defaults to None (the module and
+            function name).
+        items (Callable, optional): counts the processed items from the
+            function's result. Defaults to None.
+
+    Returns:
+        Callable: the decorator
+    """
+
+    def decorator(func):
+        stage_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            with trace(stage_name) as span:
+                result = func(*args, **kwargs)
+                if items is not None:
+                    span["items"] = items(result)
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def stats() -> dict:
+    """Get the recorded totals of each stage
+
+    Returns:
+        dict: calls, seconds, items and allocated bytes of each stage
+    """
+    return {name: dict(values) for name, values in _stats.items()}
+
+
+def summary() -> str:
+    """Format the recorded stages as a table, slowest first
+
+    Returns:
+        str: the summary table
+    """
+    header = f"{'stage':<40}{'calls':>8}{'total s':>12}{'mean ms':>12}"
+    header += f"{'items':>12}{'items/s':>14}{'alloc KiB':>12}"
+    rows = [header, "-" * len(header)]
+
+    for name, values in sorted(_stats.items(), key=lambda item: -item[1]["seconds"]):
+        seconds = values["seconds"]
+        rate = values["items"] / seconds if seconds and values["items"] else 0
+
+        row = f"{name:<40}{values['calls']:>8}{seconds:>12.4f}"
+        row += f"{seconds / values['calls'] * 1e3:>12.3f}{values['items']:>12}"
+        row += f"{rate:>14.0f}{values['alloc_bytes'] / 1024:>12.1f}"
+        rows.append(row)
+
+    return "\n".join(rows)
+
+
+def dump_chrome_trace(path):
+    """Write the recorded spans in the Chrome trace event format
+
+    The file opens in chrome://tracing or Perfetto.
+
+    Args:
+        path (str | Path): output JSON file
+    """
+    with open(path, mode="w") as f:
+        json.dump({"traceEvents": _events, "displayTimeUnit": "ms"}, f)
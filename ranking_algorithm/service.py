@@ -0,0 +1,321 @@
+"""
+Serve "best spaces combinations for target T on date D" queries over a
+preloaded availability index
+"""
+
+import argparse
+import asyncio
+import collections
+import datetime
+import heapq
+import json
+import random
+import time
+
+import aggregates
+import benchmark
+import numpy as np
+import parsing
+import utils
+from availability import AvailabilityIndex
+
+
+class RankingService:
+    """Asyncio ranking service that coalesces concurrent requests
+
+    Requests arriving within ``batch_window`` seconds of the first queued
+    one are scored together in one vectorized pass, requests on the same
+    date also share their combinations and aggregates. The aggregates of
+    the ``max_dates`` most recently queried dates are kept across batches.
+    """
+
+    def __init__(
+        self,
+        index: AvailabilityIndex,
+        cancellable: dict = None,
+        k: int = 10,
+        max_size: int = None,
+        batch_window: float = 0.002,
+        max_batch: int = 256,
+        max_dates: int = 64,
+    ):
+        self.index = index
+        self.cancellable = cancellable or {}
+        self.k = k
+        self.max_size = max_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_dates = max_dates
+
+        self.num_requests = 0
+        self.num_batches = 0
+        self._date_aggregates = collections.OrderedDict()
+        self._index_version = index.version
+        self._queue = None
+        self._task = None
+
+    async def __aenter__(self) -> "RankingService":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def start(self):
+        """Start the batching loop on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._serve())
+
+    async def stop(self):
+        """Stop the batching loop, queued requests are cancelled"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        while not self._queue.empty():
+            self._queue.get_nowait()[2].cancel()
+
+        self._task = None
+
+    async def rank(self, target: int, date: datetime.date) -> list[tuple[float, tuple]]:
+        """Rank the spaces combinations of a date against a target
+
+        Args:
+            target (int): the target time value to be obtained
+            date (datetime.date): the date to rank
+
+        Returns:
+            list[tuple[float, tuple]]: best scores and their combinations
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((target, date, future))
+
+        return await future
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch: list):
+        """Score a batch of requests and resolve their futures"""
+        batch = [request for request in batch if not request[2].cancelled()]
+        self.num_requests += len(batch)
+        self.num_batches += 1
+
+        try:
+            rankings = self.rank_batch([(target, date) for target, date, _ in batch])
+        except Exception as error:
+            for _, _, future in batch:
+                future.set_exception(error)
+            return
+
+        for (_, _, future), ranking in zip(batch, rankings):
+            future.set_result(ranking)
+
+    def _aggregates(self, date: datetime.date) -> tuple[list, tuple]:
+        """Find the combinations of a date and their aggregates, the least
+        recently queried date is evicted once max_dates are cached"""
+        date_aggregates = self._date_aggregates
+        if date in date_aggregates:
+            date_aggregates.move_to_end(date)
+            return date_aggregates[date]
+
+        time_ranges = self.index.time_ranges(date)
+        combs = list(utils.get_space_combinations(time_ranges, self.max_size))
+        cache = aggregates.SubsetAggregateCache(
+            time_ranges, cancellable=self.cancellable
+        )
+        date_aggregates[date] = (combs, cache.aggregate(combs))
+
+        if len(date_aggregates) > self.max_dates:
+            date_aggregates.popitem(last=False)
+
+        return date_aggregates[date]
+
+    def rank_batch(self, queries: list[tuple[int, datetime.date]]) -> list[list]:
+        """Rank many (target, date) queries in one vectorized scoring pass
+
+        Args:
+            queries (list[tuple[int, datetime.date]]): target and date pairs
+
+        Returns:
+            list[list]: best scores and their combinations for each query
+        """
+        # Combinations and aggregates of a date are reused across batches
+        # until the index changes
+        if self._index_version != self.index.version:
+            self._date_aggregates.clear()
+            self._index_version = self.index.version
+
+        # The batch keeps its own dates even if the cache evicts them
+        date_aggregates = {}
+        segments = []
+
+        for target, date in queries:
+            if date not in date_aggregates:
+                date_aggregates[date] = self._aggregates(date)
+
+            combs, _ = date_aggregates[date]
+            if combs:
+                segments.append((target, date))
+
+        rankings = {}
+        if segments:
+            time_spans, cancellable_spaces, spaces, counts = [], [], [], []
+            for target, date in segments:
+                combs, (date_time_spans, date_cancellable, date_spaces) = (
+                    date_aggregates[date]
+                )
+                time_spans.extend(date_time_spans)
+                cancellable_spaces.extend(date_cancellable)
+                spaces.extend(date_spaces)
+                counts.append(len(combs))
+
+            z_scores = utils.cal_zscores_segments(
+                time_spans, [target for target, _ in segments], counts
+            )
+            scores = utils.cal_scores_batch(z_scores, cancellable_spaces, spaces)
+
+            start = 0
+            for (target, date), count in zip(segments, counts):
+                combs, _ = date_aggregates[date]
+                rankings[target, date] = heapq.nlargest(
+                    self.k,
+                    zip(scores[start : start + count].tolist(), combs),
+                    key=utils.ranking_key,
+                )
+                start += count
+
+        return [rankings.get((target, date), []) for target, date in queries]
+
+
+class LocalClient:
+    """In-process client used to load test a RankingService"""
+
+    def __init__(self, service: RankingService):
+        self.service = service
+
+    async def rank(self, target: int, date: datetime.date) -> list[tuple[float, tuple]]:
+        return await self.service.rank(target, date)
+
+    async def run_load(self, queries: list, concurrency: int = 64) -> dict:
+        """Send queries with bounded concurrency and measure their latency
+
+        Args:
+            queries (list[tuple[int, datetime.date]]): target and date pairs
+            concurrency (int, optional): max requests in flight. Defaults to 64.
+
+        Returns:
+            dict: throughput, latency percentiles in ms and batching stats
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def send(target, date):
+            async with semaphore:
+                start = time.perf_counter()
+                await self.rank(target, date)
+                latencies.append(time.perf_counter() - start)
+
+        num_batches = self.service.num_batches
+        start = time.perf_counter()
+        await asyncio.gather(*(send(target, date) for target, date in queries))
+        seconds = time.perf_counter() - start
+        num_batches = self.service.num_batches - num_batches
+
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1e3
+
+        return {
+            "requests": len(queries),
+            "seconds": round(seconds, 4),
+            "requests_per_sec": round(len(queries) / seconds),
+            "p50_ms": round(p50, 3),
+            "p90_ms": round(p90, 3),
+            "p99_ms": round(p99, 3),
+            "max_ms": round(max(latencies) * 1e3, 3),
+            "batches": num_batches,
+            "mean_batch_size": round(len(queries) / num_batches, 2),
+        }
+
+
+async def load_test(
+    index: AvailabilityIndex,
+    num_requests: int = 1000,
+    concurrency: int = 64,
+    cancellable: dict = None,
+    batch_window: float = 0.002,
+    seed: int = 0,
+) -> dict:
+    """Load test a service over an index with random (target, date) queries
+
+    Args:
+        index (AvailabilityIndex): preloaded availability
+        num_requests (int, optional): number of queries. Defaults to 1000.
+        concurrency (int, optional): max requests in flight. Defaults to 64.
+        cancellable (dict, optional): whether each space is cancellable.
+            Defaults to None (no cancellable spaces).
+        batch_window (float, optional): coalescing window in seconds.
+            Defaults to 0.002.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        dict: the LocalClient.run_load report
+    """
+    rng = random.Random(seed)
+    dates = index.dates
+    queries = [(rng.randint(1, 48), rng.choice(dates)) for _ in range(num_requests)]
+
+    async with RankingService(
+        index, cancellable=cancellable, batch_window=batch_window
+    ) as service:
+        return await LocalClient(service).run_load(queries, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spaces", type=int, default=10)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-window", type=float, default=0.002)
+    args = parser.parse_args()
+
+    spaces_data = benchmark.generate_reservations(
+        args.spaces, args.days, cancellable_ratio=0.3
+    )
+    cancellable = {}
+    for space, details in spaces_data.items():
+        cancellable[space] = details["cancellable"]
+        for available_date in details["available_dates"]:
+            parsing.decode_date_time(available_date)
+
+    report = asyncio.run(
+        load_test(
+            AvailabilityIndex.from_spaces_data(spaces_data),
+            args.requests,
+            args.concurrency,
+            cancellable,
+            args.batch_window,
+        )
+    )
+    print(json.dumps(report, indent=4))
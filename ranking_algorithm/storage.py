@@ -0,0 +1,272 @@
+"""
+Compact binary storage of the encoded availability
+
+Layout (little endian):
+    header      magic, version, slot minutes, num spaces, num dates, index size
+    index       UTF-8 JSON {"spaces": [...], "dates": [...]}
+    bits        uint8 (num spaces, num dates, bytes per row), bit i is slot i
+    time_range  uint16 (num spaces, num dates)
+    present     uint8 (num spaces, num dates), 1 where the pair was encoded
+
+Every section starts on an 8 bytes boundary so it can be memory-mapped.
+"""
+
+import datetime
+import json
+import struct
+
+import numpy as np
+import parsing
+import utils
+
+MAGIC = b"RAVL"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+ALIGNMENT = 8
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _bytes_per_row(slot_minutes: int) -> int:
+    return -(-utils.slots_per_day(slot_minutes) // 8)
+
+
+def _layout(index_size: int, num_spaces: int, num_dates: int, row_size: int) -> dict:
+    """Find the offset of every section of the file
+
+    Returns:
+        dict: offset of each section and the file size
+    """
+    bits = _align(HEADER.size + index_size)
+    time_range = _align(bits + num_spaces * num_dates * row_size)
+    present = _align(time_range + num_spaces * num_dates * 2)
+    size = present + num_spaces * num_dates
+
+    return {"bits": bits, "time_range": time_range, "present": present, "size": size}
+
+
+def _sort_dates(dates) -> list[str]:
+    return sorted(dates, key=lambda date: datetime.datetime.strptime(date, "%d/%m/%Y"))
+
+
+def _write(path, spaces: list, dates: list, encoded_items, slot_minutes: int):
+    """Write the encoded spaces into a new binary file
+
+    Args:
+        path (str | Path): output file
+        spaces (list): every space name, in file order
+        dates (list): every date key, in file order
+        encoded_items (Iterable[tuple[str, dict]]): space name and its encoded
+            time for each date
+        slot_minutes (int): slot size the data was encoded with
+    """
+    row_size = _bytes_per_row(slot_minutes)
+    index = json.dumps({"spaces": spaces, "dates": dates}).encode()
+    layout = _layout(len(index), len(spaces), len(dates), row_size)
+
+    with open(path, mode="wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC, VERSION, slot_minutes, len(spaces), len(dates), len(index)
+            )
+        )
+        f.write(index)
+        f.truncate(layout["size"])
+
+    if not spaces or not dates:
+        return
+
+    shape = (len(spaces), len(dates))
+    bits = np.memmap(path, np.uint8, "r+", layout["bits"], shape + (row_size,))
+    time_range = np.memmap(path, "<u2", "r+", layout["time_range"], shape)
+    present = np.memmap(path, np.uint8, "r+", layout["present"], shape)
+
+    space_positions = {space: i for i, space in enumerate(spaces)}
+    date_positions = {date: i for i, date in enumerate(dates)}
+
+    for space, encoded_dates in encoded_items:
+        i = space_positions[space]
+
+        for date_as_key, encoded_date in encoded_dates.items():
+            j = date_positions[date_as_key]
+
+            bits[i, j] = np.frombuffer(
+                encoded_date["enc"].to_bytes(row_size, "little"), np.uint8
+            )
+            time_range[i, j] = encoded_date["time_range"]
+            present[i, j] = 1
+
+    for array in (bits, time_range, present):
+        array.flush()
+
+
+def write_encoded(path, encoded_time: dict, slot_minutes: int = 60):
+    """Save the output of encode_time_range in the binary format
+
+    Args:
+        path (str | Path): output file
+        encoded_time (dict): encoded time for each space-date pair
+        slot_minutes (int, optional): slot size the data was encoded with.
+            Defaults to 60.
+    """
+    spaces = list(encoded_time)
+    dates = _sort_dates({date for dates in encoded_time.values() for date in dates})
+
+    _write(path, spaces, dates, encoded_time.items(), slot_minutes)
+
+
+class EncodedAvailability:
+    """Memory-mapped view over a binary encoded availability file
+
+    The ``bits``, ``time_range`` and ``present`` arrays are read-only
+    ``numpy.memmap`` views, nothing is copied until it is indexed.
+    """
+
+    def __init__(self, path):
+        with open(path, mode="rb") as f:
+            magic, version, slot_minutes, num_spaces, num_dates, index_size = (
+                HEADER.unpack(f.read(HEADER.size))
+            )
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an encoded availability file")
+
+            index = json.loads(f.read(index_size))
+
+        self.path = path
+        self.slot_minutes = slot_minutes
+        self.spaces = index["spaces"]
+        self.dates = index["dates"]
+        self._space_positions = {space: i for i, space in enumerate(self.spaces)}
+        self._date_positions = {date: i for i, date in enumerate(self.dates)}
+
+        row_size = _bytes_per_row(slot_minutes)
+        layout = _layout(index_size, num_spaces, num_dates, row_size)
+        shape = (num_spaces, num_dates)
+
+        # numpy can't memory-map empty sections
+        if num_spaces and num_dates:
+            self.bits = np.memmap(
+                path, np.uint8, "r", layout["bits"], shape + (row_size,)
+            )
+            self.time_range = np.memmap(path, "<u2", "r", layout["time_range"], shape)
+            self.present = np.memmap(path, np.uint8, "r", layout["present"], shape)
+        else:
+            self.bits = np.zeros(shape + (row_size,), np.uint8)
+            self.time_range = np.zeros(shape, "<u2")
+            self.present = np.zeros(shape, np.uint8)
+
+    def get_enc(self, space: str, date_as_key: str) -> int:
+        """Get the encoded bit row of a space-date pair
+
+        Args:
+            space (str): space name
+            date_as_key (str): date formatted as dd/mm/YYYY
+
+        Returns:
+            int: encoded bit row, 0 if the pair isn't encoded
+        """
+        i = self._space_positions[space]
+        j = self._date_positions.get(date_as_key)
+        if j is None:
+            return 0
+
+        return int.from_bytes(self.bits[i, j].tobytes(), "little")
+
+    def unpack(self, space: str) -> np.ndarray:
+        """Expand the bit rows of a space to one item per slot
+
+        Args:
+            space (str): space name
+
+        Returns:
+            np.ndarray: uint8 array of shape (num dates, slots per day)
+        """
+        i = self._space_positions[space]
+
+        return np.unpackbits(
+            self.bits[i],
+            axis=-1,
+            count=utils.slots_per_day(self.slot_minutes),
+            bitorder="little",
+        )
+
+    def iter_encoded(self):
+        """Rebuild the encode_time_range layout one space at a time
+
+        Yields:
+            tuple[str, dict]: space name and its encoded time for each date
+        """
+        for i, space in enumerate(self.spaces):
+            encoded_dates = {}
+
+            for j in np.flatnonzero(self.present[i]):
+                encoded_dates[self.dates[j]] = {
+                    "enc": int.from_bytes(self.bits[i, j].tobytes(), "little"),
+                    "time_range": int(self.time_range[i, j]),
+                }
+
+            yield space, encoded_dates
+
+    def to_encoded(self) -> dict:
+        """Rebuild the encode_time_range layout
+
+        Returns:
+            dict: encoded time for each space-date pair
+        """
+        return dict(self.iter_encoded())
+
+
+def open_encoded(path) -> EncodedAvailability:
+    """Memory-map a binary encoded availability file
+
+    Args:
+        path (str | Path): binary file
+
+    Returns:
+        EncodedAvailability: read-only view over the file
+    """
+    return EncodedAvailability(path)
+
+
+def json_to_binary(json_path, binary_path, slot_minutes: int = 60):
+    """Convert an encoded JSON file into the binary format
+
+    The JSON file is read twice, once for its index then once for its
+    rows, so only one space is held in memory at a time.
+
+    Args:
+        json_path (str | Path): encoded JSON file
+        binary_path (str | Path): output binary file
+        slot_minutes (int, optional): slot size the data was encoded with.
+            Defaults to 60.
+    """
+    spaces, dates = [], set()
+    with open(json_path, mode="r") as f:
+        for space, encoded_dates in parsing.iter_json_object_items(f):
+            spaces.append(space)
+            dates.update(encoded_dates)
+
+    with open(json_path, mode="r") as f:
+        _write(
+            binary_path,
+            spaces,
+            _sort_dates(dates),
+            parsing.iter_json_object_items(f),
+            slot_minutes,
+        )
+
+
+def binary_to_json(binary_path, json_path, indent: int = 4):
+    """Convert a binary file back into the encoded JSON layout
+
+    Args:
+        binary_path (str | Path): binary file
+        json_path (str | Path): output encoded JSON file
+        indent (int, optional): JSON indentation. Defaults to 4.
+    """
+    encoded_time = open_encoded(binary_path).to_encoded()
+
+    with open(json_path, mode="w") as f:
+        json.dump(encoded_time, f, indent=indent, cls=parsing.DateTimeEncoder)
@@ -1,13 +1,337 @@
+import datetime
+import heapq
 import math
-from itertools import chain, combinations
+from itertools import chain, combinations, islice
 
+import aggregates
+import numpy as np
+import profiling
 
-def get_space_combinations(spaces: list):
-    combs = list(
-        chain.from_iterable(combinations(spaces, r) for r in range(len(spaces) + 1))
-    )
-    # Remove the first empty element [(),]
-    return combs[1:]
+# Slot sizes (in minutes) a day can be split into
+SLOT_SIZES = (60, 30, 15)
+
+
+def slots_per_day(slot_minutes: int = 60) -> int:
+    """Get the number of slots a day is split into
+
+    Args:
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
+
+    Raises:
+        ValueError: if the slot size is not one of SLOT_SIZES
+
+    Returns:
+        int: number of slots in a day
+    """
+    if slot_minutes not in SLOT_SIZES:
+        raise ValueError(
+            f"slot_minutes must be one of {SLOT_SIZES}, got {slot_minutes}"
+        )
+
+    return 24 * 60 // slot_minutes
+
+
+def interval_mask(
+    start: datetime.datetime, end: datetime.datetime, slot_minutes: int = 60
+) -> int:
+    """Encode a free time interval of a day as a bit row
+
+    The interval is half-open and only the slots it fully covers are
+    flipped, e.g. 08:00 -> 11:00 flips the 08, 09 and 10 hour slots
+    while 08:30 -> 10:30 only flips the 09 one.
+
+    Args:
+        start (datetime.datetime): interval start
+        end (datetime.datetime): interval end, an end on a later date
+            runs until the end of the start's day
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
+
+    Returns:
+        int: bit row where bit i is set if slot i is free
+    """
+    num_slots = slots_per_day(slot_minutes)
+
+    # A partly free slot isn't free, so the start is rounded up
+    start_slot = -(-(start.hour * 60 + start.minute) // slot_minutes)
+
+    if end.date() > start.date():
+        end_slot = num_slots
+    else:
+        end_slot = (end.hour * 60 + end.minute) // slot_minutes
+
+    if end_slot <= start_slot:
+        return 0
+
+    return ((1 << (end_slot - start_slot)) - 1) << start_slot
+
+
+def popcount(enc: int) -> int:
+    """Count the free slots of a bit row
+
+    Args:
+        enc (int): encoded bit row
+
+    Returns:
+        int: number of set bits
+    """
+    return enc.bit_count()
+
+
+def union_masks(encs) -> int:
+    """Combine bit rows, a slot is free if it is free in any row
+
+    Args:
+        encs (Iterable[int]): encoded bit rows
+
+    Returns:
+        int: bitwise OR of the rows
+    """
+    union = 0
+    for enc in encs:
+        union |= enc
+
+    return union
+
+
+def intersect_masks(encs, slot_minutes: int = 60) -> int:
+    """Combine bit rows, a slot is free only if it is free in every row
+
+    Args:
+        encs (Iterable[int]): encoded bit rows
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
+
+    Returns:
+        int: bitwise AND of the rows
+    """
+    intersection = (1 << slots_per_day(slot_minutes)) - 1
+    for enc in encs:
+        intersection &= enc
+
+    return intersection
+
+
+def mask_to_bits(enc: int, slot_minutes: int = 60) -> list[int]:
+    """Expand a bit row to a list of 0/1 slots
+
+    Args:
+        enc (int): encoded bit row
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
+
+    Returns:
+        list[int]: one item per slot of the day
+    """
+    return [(enc >> i) & 1 for i in range(slots_per_day(slot_minutes))]
+
+
+def get_space_combinations(spaces: list, max_size: int = None):
+    """Lazily generate the non-empty spaces combinations
+
+    Args:
+        spaces (list): spaces names
+        max_size (int, optional): max number of spaces in a combination.
+            Defaults to None (no cap).
+
+    Returns:
+        Iterator[tuple]: combinations ordered by their size
+    """
+    spaces = tuple(spaces)
+    if max_size is None or max_size > len(spaces):
+        max_size = len(spaces)
+
+    return chain.from_iterable(combinations(spaces, r) for r in range(1, max_size + 1))
+
+
+def cal_std_batch(combs_time_span, target: int) -> float:
+    """Calculate the std of the combinations' time span around the target
+
+    Args:
+        combs_time_span (ArrayLike): available time of each spaces combination
+        target (int): the target time value to be obtained
+
+    Returns:
+        float: std value
+    """
+    time_spans = np.asarray(combs_time_span, dtype=np.float64)
+
+    return float(np.sqrt(np.mean(np.square(time_spans - target))))
+
+
+def cal_subsets_std(time_spans, target: int, max_size: int = None) -> float:
+    """Calculate the std around the target of the summed time spans of
+    every non-empty subset without enumerating them
+
+    Among the subsets of r spaces out of n, each space is in C(n-1, r-1)
+    of them and each pair of spaces in C(n-2, r-2), which gives the count,
+    sum and sum of squares of their time spans in closed form.
+
+    Args:
+        time_spans (Iterable[int]): time span of each space
+        target (int): the target time value to be obtained
+        max_size (int, optional): max number of spaces in a subset.
+            Defaults to None (no cap).
+
+    Returns:
+        float: the std, or None when there are no subsets
+    """
+    time_spans = list(time_spans)
+    n = len(time_spans)
+    if max_size is None or max_size > n:
+        max_size = n
+
+    if max_size < 1:
+        return None
+
+    total = sum(time_spans)
+    squares = sum(time_span * time_span for time_span in time_spans)
+
+    count = sum(math.comb(n, r) for r in range(1, max_size + 1))
+    with_space = sum(math.comb(n - 1, r - 1) for r in range(1, max_size + 1))
+    with_pair = sum(math.comb(n - 2, r - 2) for r in range(2, max_size + 1))
+
+    sum_spans = total * with_space
+    sum_squares = squares * with_space + (total * total - squares) * with_pair
+    deviations = sum_squares - 2 * target * sum_spans + target * target * count
+
+    return float(np.sqrt(deviations / count))
+
+
+def cal_zscores_batch(combs_time_span, target: int, std: float = None) -> np.ndarray:
+    """Calculate the z-scores of the combinations' time span in one pass
+
+    Args:
+        combs_time_span (ArrayLike): available time of each spaces combination
+        target (int): the target time value to be obtained
+        std (float, optional): precomputed std, it is calculated around the
+            target from combs_time_span when missing. Defaults to None.
+
+    Returns:
+        np.ndarray: z-scores for the spaces' combinations
+    """
+    time_spans = np.asarray(combs_time_span, dtype=np.float64)
+
+    if std is None:
+        std = cal_std_batch(time_spans, target)
+
+    # Every combination hits the target exactly
+    if std == 0:
+        return np.zeros_like(time_spans)
+
+    return (time_spans - target) / std
+
+
+def cal_raw_scores_batch(z_scores, cancellable_spaces, spaces) -> np.ndarray:
+    """Calculate the unrounded scores of the spaces combinations in one pass
+
+    get_score and cal_scores round these, so there is a single copy of
+    the score formula.
+
+    Args:
+        z_scores (ArrayLike): z-scores for the spaces' combinations
+        cancellable_spaces (ArrayLike): num of cancellable spaces for each combination
+        spaces (ArrayLike): num of spaces for each combination
+
+    Returns:
+        np.ndarray: unrounded scores
+    """
+    z_scores = np.asarray(z_scores, dtype=np.float64)
+    cancellable_spaces = np.asarray(cancellable_spaces, dtype=np.float64)
+    spaces = np.asarray(spaces, dtype=np.float64)
+
+    denominator = (0.6 * cancellable_spaces) + (0.3 * spaces)
+    scores = np.empty_like(z_scores)
+
+    # Above the target the score shrinks as the excess grows,
+    # below it the score is negative and proportional to the shortage
+    positive = z_scores > 0
+    scores[positive] = 1 / (denominator[positive] + (0.1 * z_scores[positive]))
+
+    negative = ~positive
+    scores[negative] = (0.1 * z_scores[negative]) / denominator[negative]
+
+    return scores
+
+
+def round_scores(scores) -> np.ndarray:
+    """Round scores to 3 decimals exactly like the builtin round
+
+    np.round scales by 10**3 first, so it only disagrees with round() on
+    values within rounding error of a half, those few are rounded again
+    one by one.
+
+    Args:
+        scores (ArrayLike): unrounded scores
+
+    Returns:
+        np.ndarray: rounded scores
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    rounded = np.round(scores, 3)
+
+    scaled = scores * 1e3
+    halves = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    rounded[halves] = [round(score, 3) for score in scores[halves].tolist()]
+
+    return rounded
+
+
+def cal_scores_batch(z_scores, cancellable_spaces, spaces) -> np.ndarray:
+    """Calculate the scores of the spaces combinations in one pass
+
+    Args:
+        z_scores (ArrayLike): z-scores for the spaces' combinations
+        cancellable_spaces (ArrayLike): num of cancellable spaces for each combination
+        spaces (ArrayLike): num of spaces for each combination
+
+    Returns:
+        np.ndarray: scores rounded to 3 decimals like get_score
+    """
+    return round_scores(cal_raw_scores_batch(z_scores, cancellable_spaces, spaces))
+
+
+def cal_zscores_segments(combs_time_span, targets, counts) -> np.ndarray:
+    """Calculate the z-scores of several independent groups in one pass
+
+    The combinations of each group are contiguous, every group has its
+    own target and std, e.g. concurrent ranking requests.
+
+    Args:
+        combs_time_span (ArrayLike): available time of each spaces combination
+        targets (ArrayLike): the target time value of each group
+        counts (ArrayLike): number of combinations of each group, all above 0
+
+    Returns:
+        np.ndarray: z-scores for the spaces' combinations
+    """
+    time_spans = np.asarray(combs_time_span, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+
+    deviations = time_spans - np.repeat(np.asarray(targets, dtype=np.float64), counts)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    stds = np.sqrt(np.add.reduceat(np.square(deviations), offsets) / counts)
+    stds = np.repeat(stds, counts)
+
+    # Groups where every combination hits the target exactly get 0
+    return np.divide(deviations, stds, out=np.zeros_like(deviations), where=stds != 0)
+
+
+@profiling.stage(items=len)
+def score_combinations_batch(
+    combs_time_span, cancellable_spaces, spaces, target: int
+) -> np.ndarray:
+    """Score the spaces combinations from their raw details in one pass
+
+    Args:
+        combs_time_span (ArrayLike): available time of each spaces combination
+        cancellable_spaces (ArrayLike): num of cancellable spaces for each combination
+        spaces (ArrayLike): num of spaces for each combination
+        target (int): the target time value to be obtained
+
+    Returns:
+        np.ndarray: scores rounded to 3 decimals
+    """
+    z_scores = cal_zscores_batch(combs_time_span, target)
+
+    return cal_scores_batch(z_scores, cancellable_spaces, spaces)
 
 
 def cal_std(combs_time_span: list[int], target: int) -> float:
@@ -18,12 +342,9 @@ def cal_std(combs_time_span: list[int], target: int) -> float:
         target (int): the target time value to be obtained
 
     Returns:
-        list[float]: list of z-scores for the spaces' combination
+        float: std value
     """
-    var = sum(pow(x - target, 2) for x in combs_time_span) / len(combs_time_span)
-    std = math.sqrt(var)
-
-    return std
+    return cal_std_batch(combs_time_span, target)
 
 
 def cal_zscores(combs_time_span: list[int], target: int) -> list[float]:
@@ -36,18 +357,16 @@ def cal_zscores(combs_time_span: list[int], target: int) -> list[float]:
     Returns:
         list[float]: list of z-scores for the spaces' combination
     """
-    std = cal_std(combs_time_span)
-
-    z_scores = [(time_span - target) / std for time_span in combs_time_span]
+    return cal_zscores_batch(combs_time_span, target).tolist()
 
-    return z_scores
 
-
-def count_ones_sets(combination: list | tuple) -> int:
+def count_ones_sets(combination: list | tuple | int) -> int:
     """Count the number of lists containing sequence of one
 
     Args:
-        combination (list | tuple): the chromosomes combination
+        combination (list | tuple | int): the chromosomes combination,
+            or an already encoded bit row. Items are expected to be 0 or 1,
+            anything other than 1 counts as 0.
 
     Returns:
         int: the number of list of ones
@@ -55,13 +374,221 @@ def count_ones_sets(combination: list | tuple) -> int:
     Example:
         count_ones_sets([1, 0, 1, 0, 1, 0, 1, 1, 0]) -> count = 4
     """
+    if not isinstance(combination, int):
+        combination = bits_to_mask(combination)
+
+    return count_runs(combination)
+
+
+def bits_to_mask(bits: list | tuple) -> int:
+    """Pack a list of 0/1 slots into a bit row
+
+    Args:
+        bits (list | tuple): one item per slot
+
+    Returns:
+        int: bit row where bit i is set if slot i is 1, any other value
+        counts as a busy slot
+    """
+    enc = 0
+    for i, bit in enumerate(bits):
+        if bit == 1:
+            enc |= 1 << i
+
+    return enc
+
+
+def count_runs(enc: int) -> int:
+    """Count the runs of free slots in a bit row
+
+    A slot ends a run when it is free and the next one isn't.
+
+    Args:
+        enc (int): encoded bit row
+
+    Returns:
+        int: number of runs
+    """
+    return popcount(enc & ~(enc >> 1))
+
+
+def longest_run(enc: int) -> int:
+    """Find the length of the longest run of free slots
+
+    Each step keeps only the slots followed by a free slot, so a run of
+    length n survives exactly n steps.
+
+    Args:
+        enc (int): encoded bit row
+
+    Returns:
+        int: length of the longest run
+    """
+    length = 0
+    while enc:
+        enc &= enc >> 1
+        length += 1
+
+    return length
+
+
+def run_positions(enc: int) -> list[tuple[int, int]]:
+    """Find where each run of free slots starts and how long it is
+
+    Args:
+        enc (int): encoded bit row
+
+    Returns:
+        list[tuple[int, int]]: start slot and length of each run
+    """
+    starts = enc & ~(enc << 1)
+    ends = enc & ~(enc >> 1)
+
+    positions = []
+    while starts:
+        # Isolate the lowest start and the lowest end, they belong to the same run
+        start = (starts & -starts).bit_length() - 1
+        end = (ends & -ends).bit_length() - 1
+        positions.append((start, end - start + 1))
+
+        starts &= starts - 1
+        ends &= ends - 1
+
+    return positions
+
+
+def free_block_starts(enc: int, num_slots: int) -> int:
+    """Find the slots that start a free block of at least num_slots
+
+    Args:
+        enc (int): encoded bit row
+        num_slots (int): minimum block length, at least 1
+
+    Raises:
+        ValueError: if num_slots is below 1
+
+    Returns:
+        int: bit row where bit i is set if slots i .. i + num_slots - 1 are free
+    """
+    if num_slots < 1:
+        raise ValueError(f"num_slots must be at least 1, got {num_slots}")
+
+    # Doubling the covered length each step keeps it to O(log num_slots) steps
+    covered = 1
+    while covered < num_slots:
+        step = min(covered, num_slots - covered)
+        enc &= enc >> step
+        covered += step
+
+    return enc
+
+
+def unpack_masks(encs, slot_minutes: int = 60) -> np.ndarray:
+    """Expand many bit rows to a 0/1 slots array
+
+    Args:
+        encs (Iterable[int]): encoded bit rows
+        slot_minutes (int, optional): slot size in minutes. Defaults to 60.
+
+    Returns:
+        np.ndarray: uint8 array of shape (num rows, slots per day)
+    """
+    num_slots = slots_per_day(slot_minutes)
+    row_size = -(-num_slots // 8)
+
+    packed = np.frombuffer(
+        b"".join(enc.to_bytes(row_size, "little") for enc in encs), dtype=np.uint8
+    ).reshape(-1, row_size)
+
+    return np.unpackbits(packed, axis=-1, count=num_slots, bitorder="little")
+
+
+def count_runs_batch(slots) -> np.ndarray:
+    """Count the runs of free slots of many rows at once
+
+    Args:
+        slots (ArrayLike): 0/1 array whose last axis is the slots of a day,
+            e.g. unpack_masks output
+
+    Returns:
+        np.ndarray: number of runs of each row
+    """
+    slots = np.asarray(slots, dtype=bool)
+    ends = slots.copy()
+    ends[..., :-1] &= ~slots[..., 1:]
+
+    return ends.sum(axis=-1)
+
+
+def longest_run_batch(slots) -> np.ndarray:
+    """Find the longest run of free slots of many rows at once
+
+    Args:
+        slots (ArrayLike): 0/1 array whose last axis is the slots of a day
+
+    Returns:
+        np.ndarray: length of the longest run of each row
+    """
+    slots = np.asarray(slots, dtype=bool)
+    length = np.zeros(slots.shape[:-1], dtype=np.int64)
+
+    # Same shrinking as longest_run, applied to every row per step
+    while slots.shape[-1] and slots.any():
+        length += slots.any(axis=-1)
+        slots = slots[..., :-1] & slots[..., 1:]
 
-    count = 0
-    for i, j in zip(combination, combination[1:] + [0]):
-        if i == 1 and j == 0:
-            count += 1
+    return length
 
-    return count
+
+def has_free_block_batch(slots, num_slots: int) -> np.ndarray:
+    """Check many rows at once for a free block of at least num_slots
+
+    Args:
+        slots (ArrayLike): 0/1 array whose last axis is the slots of a day
+        num_slots (int): minimum block length, at least 1
+
+    Raises:
+        ValueError: if num_slots is below 1
+
+    Returns:
+        np.ndarray: bool for each row
+    """
+    if num_slots < 1:
+        raise ValueError(f"num_slots must be at least 1, got {num_slots}")
+
+    slots = np.asarray(slots, dtype=bool)
+    if num_slots > slots.shape[-1]:
+        return np.zeros(slots.shape[:-1], dtype=bool)
+
+    windows = np.lib.stride_tricks.sliding_window_view(slots, num_slots, axis=-1)
+
+    return windows.all(axis=-1).any(axis=-1)
+
+
+def get_free_block_combinations(spaces_enc: dict, num_slots: int, max_size: int = None):
+    """Find the spaces combinations giving a contiguous free block on a date
+
+    The combination's availability is the OR of its spaces' bit rows, so
+    a block can span slots that different spaces free.
+
+    Args:
+        spaces_enc (dict): encoded bit row of each space on the date
+        num_slots (int): minimum block length
+        max_size (int, optional): max number of spaces in a combination.
+            Defaults to None (no cap).
+
+    Yields:
+        tuple[tuple, int]: combination and the starts of its free blocks
+    """
+    spaces = [space for space, enc in spaces_enc.items() if enc]
+
+    for comb in get_space_combinations(spaces, max_size):
+        starts = free_block_starts(
+            union_masks(spaces_enc[space] for space in comb), num_slots
+        )
+
+        if starts:
+            yield comb, starts
 
 
 def get_score(z_score: float, num_cancellable_spaces: int, num_spaces: int) -> float:
@@ -75,15 +602,7 @@ def get_score(z_score: float, num_cancellable_spaces: int, num_spaces: int) -> f
     Returns:
         float: score value
     """
-    if z_score > 0:
-        score = 1 / (
-            (0.6 * num_cancellable_spaces) + (0.3 * num_spaces) + (0.1 * z_score)
-        )
-
-    else:
-        score = (0.1 * z_score) / ((0.6 * num_cancellable_spaces) + (0.3 * num_spaces))
-
-    return round(score, 3)
+    return float(cal_scores_batch([z_score], [num_cancellable_spaces], [num_spaces])[0])
 
 
 def cal_scores(
@@ -97,37 +616,163 @@ def cal_scores(
         spaces (list[int]): num of spaces spaces for each the spaces' combination
 
     Returns:
-        list[float]: _description_
+        list[float]: scores for the spaces' combination
     """
+    return cal_scores_batch(z_scores, cancellable_spaces, spaces).tolist()
 
-    scores = []
 
-    for z_score, num_cancellable_spaces, num_spaces in zip(
-        z_scores, cancellable_spaces, spaces
-    ):
+def ranking_key(item: tuple[float, tuple]) -> tuple[float, int]:
+    """Order (score, combination) pairs, ties go to fewer spaces first
 
-        scores.append(get_score(z_score, num_cancellable_spaces, num_spaces))
+    Args:
+        item (tuple[float, tuple]): score and its combination
 
-    return scores
+    Returns:
+        tuple[float, int]: key where larger is better
+    """
+    return item[0], -len(item[1])
+
+
+def iter_chunks(iterable, size: int):
+    """Split an iterable into lists of at most size items
+
+    Args:
+        iterable (Iterable): items to split
+        size (int): max items per chunk
+
+    Yields:
+        list: the next chunk
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@profiling.stage()
+def rank_combinations(
+    time_ranges: dict,
+    target: int,
+    k: int = 10,
+    cancellable: dict = None,
+    max_size: int = None,
+    chunk_size: int = 2**12,
+    cache_size: int = 2**16,
+    tolerance: int = None,
+) -> list[tuple[float, tuple]]:
+    """Rank the spaces combinations and keep only the k best
+
+    The std of the time spans around the target is found in closed form,
+    then combinations are streamed in chunks, each scored in one
+    vectorized pass and fed to a bounded heap. Memory stays O(k +
+    chunk_size + cache_size) however many combinations there are. Equal
+    scores go to the combination with fewer spaces, then to the one
+    generated first, so the lexicographic walk ranks like the size
+    ordered one.
+
+    Above the target, adding spaces only lowers a score, so with a
+    tolerance the supersets of a combination exceeding the target by more
+    than it are skipped once its own score is below the k-th best one.
+    They couldn't enter the top k, the ranking is the same as without
+    pruning.
+
+    Args:
+        time_ranges (dict): time range of each space
+        target (int): the target time value to be obtained
+        k (int, optional): number of combinations to keep. Defaults to 10.
+        cancellable (dict, optional): whether each space is cancellable.
+            Defaults to None (no cancellable spaces).
+        max_size (int, optional): max number of spaces in a combination.
+            Defaults to None (no cap).
+        chunk_size (int, optional): combinations scored per pass.
+            Defaults to 2**12.
+        cache_size (int, optional): max combinations kept by the aggregate
+            cache. Defaults to 2**16.
+        tolerance (int, optional): excess over the target past which a
+            combination's supersets may be skipped. Defaults to None (no
+            pruning).
+
+    Returns:
+        list[tuple[float, tuple]]: best scores and their combinations
+    """
+    std = cal_subsets_std(time_ranges.values(), target, max_size)
+    if std is None or k <= 0:
+        return []
 
+    cache = aggregates.SubsetAggregateCache(
+        time_ranges, cancellable=cancellable, maxsize=cache_size
+    )
+
+    # Min-heap of the k best (score, -num spaces, -generation index, combination)
+    heap = []
+
+    # Many combinations share their score inputs
+    bounds = {}
+
+    def extend(mask: int) -> bool:
+        _, time_span, num_cancellable = cache.get_mask(mask)
+        if len(heap) < k or time_span <= target + tolerance:
+            return True
+
+        inputs = (time_span, num_cancellable, mask.bit_count())
+        if inputs not in bounds:
+            z_score = float(cal_zscores_batch([time_span], target, std)[0])
+            bounds[inputs] = get_score(z_score, *inputs[1:])
+
+        return bounds[inputs] >= heap[0][0]
+
+    combinations = cache.iter_combinations(
+        max_size, None if tolerance is None else extend
+    )
+
+    index = 0
+    for chunk in iter_chunks(combinations, chunk_size):
+        chunk, masks = zip(*chunk)
+        time_spans, cancellable_spaces, num_spaces = cache.aggregate_masks(masks)
 
-# def encode()
+        z_scores = cal_zscores_batch(time_spans, target, std)
+        scores = cal_scores_batch(z_scores, cancellable_spaces, num_spaces)
 
+        for score, combination in zip(scores.tolist(), chunk):
+            item = (score, -len(combination), -index, combination)
+            index += 1
 
-# z_scores = (-0.86, -0.43, -1.147, +1.01, -0.158, +0.339, +1.653)
-# cancellable_spaces = (1, 0, 1, 1, 2, 1, 2)
-# spaces = (1, 1, 1, 2, 2, 2, 3)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item[:3] > heap[0][:3]:
+                heapq.heapreplace(heap, item)
 
-# spaces_name = [
-#     "A1",
-#     "A2",
-#     "A3",
-#     ("A1", "A2"),
-#     ("A1", "A3"),
-#     ("A2", "A3"),
-#     ("A1", "A2", "A3"),
-# ]
+    return [(score, combination) for score, _, _, combination in sorted(heap)[::-1]]
 
-# spaces_score = dict(zip(spaces_name, cal_scores(z_scores, cancellable_spaces, spaces)))
 
-# print(sorted(spaces_score.items(), key=lambda x: x[1], reverse=True))
+def rank_date(
+    time_ranges: dict,
+    target: int,
+    k: int = 10,
+    cancellable: dict = None,
+    max_size: int = None,
+    tolerance: int = None,
+) -> list[tuple[float, tuple]]:
+    """Rank the spaces combinations of a single date
+
+    Args:
+        time_ranges (dict): time range of each space on the date
+        target (int): the target time value to be obtained
+        k (int, optional): number of combinations to keep. Defaults to 10.
+        cancellable (dict, optional): whether each space is cancellable.
+            Defaults to None (no cancellable spaces).
+        max_size (int, optional): max number of spaces in a combination.
+            Defaults to None (no cap).
+        tolerance (int, optional): allowed excess over the target before
+            pruning. Defaults to None (no pruning).
+
+    Returns:
+        list[tuple[float, tuple]]: best scores and their combinations
+    """
+    # Spaces without free time on the date can't help any combination
+    spaces_time = {
+        space: time_range for space, time_range in time_ranges.items() if time_range
+    }
+
+    return rank_combinations(
+        spaces_time, target, k, cancellable, max_size, tolerance=tolerance
+    )